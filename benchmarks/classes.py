@@ -0,0 +1,67 @@
+"""Measures the cost of creating model classes at runtime.
+
+Creates 1,000 flat model classes from field dictionaries with
+:meth:`~micromodels.Model.build_class`, and a deep hierarchy
+with one field added per level::
+
+    python benchmarks/classes.py [--count N] [--fields N] [--depth N]
+
+The time for very deep hierarchies is dominated by ``type.__new__`` itself,
+whose cost grows with the length of the MRO.
+
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import micromodels
+
+
+def field_dict(count):
+    fields = {}
+    for index in range(count):
+        if index % 2:
+            fields['int_%d' % index] = micromodels.IntegerField()
+        else:
+            fields['char_%d' % index] = micromodels.CharField()
+    return fields
+
+
+def flat_classes(count, fields):
+    for index in range(count):
+        micromodels.Model.build_class('Flat%d' % index, field_dict(fields))
+
+
+def deep_hierarchy(count):
+    base = micromodels.Model
+    for index in range(count):
+        base = base.build_class('Level%d' % index, {
+            'field_%d' % index: micromodels.IntegerField(),
+        })
+    return base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--fields', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    flat = min(timeit.repeat(lambda: flat_classes(args.count, args.fields),
+                             number=1, repeat=args.repeat))
+    print('{0} flat classes with {1} fields: {2:.1f} ms'.format(
+        args.count, args.fields, flat * 1000))
+
+    deep = min(timeit.repeat(lambda: deep_hierarchy(args.depth),
+                             number=1, repeat=args.repeat))
+    print('{0}-level deep hierarchy: {1:.1f} ms'.format(args.depth,
+                                                        deep * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measures the cost of converting scalar field values.
+
+Times :class:`~micromodels.BooleanField`, :class:`~micromodels.CharField`
+and :class:`~micromodels.JSONField` conversions of typical JSON inputs, one
+field at a time and through :meth:`~micromodels.Model.from_dict`::
+
+    python benchmarks/fields.py [--number N] [--repeat N]
+
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import micromodels
+
+
+class Flags(micromodels.Model):
+    name = micromodels.CharField()
+    code = micromodels.CharField()
+    active = micromodels.BooleanField()
+    visible = micromodels.BooleanField()
+    deleted = micromodels.BooleanField()
+    archived = micromodels.BooleanField()
+
+
+RECORD = {'name': 'widget', 'code': 'W-1', 'active': True, 'visible': 'true',
+          'deleted': 0, 'archived': None}
+
+
+def convert(field, value):
+    field.populate(value)
+    return field.to_python()
+
+
+def cases():
+    boolean = micromodels.BooleanField()
+    char = micromodels.CharField()
+    json_field = micromodels.JSONField()
+    return [
+        ('BooleanField(True)', lambda: convert(boolean, True)),
+        ("BooleanField('true')", lambda: convert(boolean, 'true')),
+        ('BooleanField(1)', lambda: convert(boolean, 1)),
+        ('BooleanField(None)', lambda: convert(boolean, None)),
+        ("CharField('text')", lambda: convert(char, 'text')),
+        ('CharField(1)', lambda: convert(char, 1)),
+        ("JSONField('[]')", lambda: convert(json_field, '[]')),
+        ('JSONField([])', lambda: convert(json_field, [])),
+        ('Flags.from_dict', lambda: Flags.from_dict(RECORD)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for label, func in cases():
+        best = min(timeit.repeat(func, number=args.number,
+                                 repeat=args.repeat))
+        print('{0:<24} {1:8.3f} us'.format(label,
+                                           best / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
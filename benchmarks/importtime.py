@@ -0,0 +1,63 @@
+"""Measures the cost of ``import micromodels`` with ``python -X importtime``.
+
+Each run uses a fresh interpreter. The median cumulative import time of the
+``micromodels`` package is reported, followed by the modules that took the
+longest to import in the last run::
+
+    python benchmarks/importtime.py [--runs N] [--max-ms LIMIT]
+
+With ``--max-ms``, the script exits with a non-zero status when the median
+exceeds the limit, so it can be used as a regression check.
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure():
+    '''Returns {module: (self us, cumulative us)} for one interpreter run.'''
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import micromodels'],
+        env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    ).stderr
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(own), int(cumulative))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=11)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--max-ms', type=float)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    totals = sorted(run['micromodels'][1] for run in runs)
+    median_ms = totals[len(totals) // 2] / 1000.0
+    print('import micromodels: {0:.2f} ms (median of {1} runs)'.format(
+        median_ms, args.runs))
+
+    print('\nslowest imports in the last run (cumulative ms):')
+    slowest = sorted(runs[-1].items(), key=lambda item: -item[1][1])
+    for name, (own, cumulative) in slowest[1:args.top + 1]:
+        print('  {0:8.2f}  {1}'.format(cumulative / 1000.0, name))
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print('\nover the limit of {0} ms'.format(args.max_ms))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Measures bulk loading of decimal prices from JSON.
+
+Decodes a JSON array of quotes with three :class:`~micromodels.DecimalField`
+prices each, reading the numbers through floats (the default) and directly
+from their text with ``parse_float = decimal.Decimal``, then serializes them
+back to JSON::
+
+    python benchmarks/prices.py [--count N] [--repeat N]
+
+"""
+import argparse
+import decimal
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import micromodels
+
+
+class Quote(micromodels.Model):
+    symbol = micromodels.CharField()
+    bid = micromodels.DecimalField(places=4)
+    ask = micromodels.DecimalField(places=4)
+    last = micromodels.DecimalField(places=4)
+
+
+class ExactQuote(Quote):
+
+    class Meta:
+        parse_float = decimal.Decimal
+
+
+def payload(count):
+    rng = random.Random(0)
+    quotes = []
+    for index in range(count):
+        price = rng.randint(100, 100000) / 100.0
+        quotes.append('{{"symbol": "S{0}", "bid": {1:.4f}, "ask": {2:.4f}, '
+                      '"last": {3:.4f}}}'.format(index, price, price + 0.01,
+                                                 price + 0.005))
+    return '[' + ', '.join(quotes) + ']'
+
+
+def load(model_class, text):
+    parse_float = model_class._meta.parse_float
+    items = json.loads(text, parse_float=parse_float or float)
+    return [model_class.from_dict(item) for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text = payload(args.count)
+    for label, model_class in (('through float', Quote),
+                               ('from JSON text', ExactQuote)):
+        best = min(timeit.repeat(lambda: load(model_class, text), number=1,
+                                 repeat=args.repeat))
+        print('load {0} quotes {1:<15} {2:8.1f} ms'.format(
+            args.count, label, best * 1000))
+
+    quotes = load(ExactQuote, text)
+    best = min(timeit.repeat(
+        lambda: json.dumps([quote.to_dict(serial=True) for quote in quotes]),
+        number=1, repeat=args.repeat))
+    print('dump {0} quotes {1:<15} {2:8.1f} ms'.format(args.count, '',
+                                                       best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Measures decoding and storing UUIDs.
+
+Decodes records with three :class:`~micromodels.UUIDField` values each,
+stored as :class:`uuid.UUID` objects and as integers with ``compact=True``,
+reports the memory held per instance, and times
+:meth:`~micromodels.UUIDField.convert_many` on a list of strings::
+
+    python benchmarks/uuids.py [--count N] [--repeat N]
+
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import micromodels
+
+
+class Link(micromodels.Model):
+    id = micromodels.UUIDField()
+    source = micromodels.UUIDField()
+    target = micromodels.UUIDField()
+
+
+class CompactLink(micromodels.Model):
+    id = micromodels.UUIDField(compact=True)
+    source = micromodels.UUIDField(compact=True)
+    target = micromodels.UUIDField(compact=True)
+
+
+def records(count):
+    return [{'id': str(uuid.uuid4()), 'source': str(uuid.uuid4()),
+             'target': str(uuid.uuid4())} for _ in range(count)]
+
+
+def memory_per_instance(model_class, items):
+    tracemalloc.start()
+    instances = [model_class.from_dict(item) for item in items]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(instances)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    items = records(args.count)
+    for model_class in (Link, CompactLink):
+        best = min(timeit.repeat(
+            lambda: [model_class.from_dict(item) for item in items],
+            number=1, repeat=args.repeat))
+        print('decode {0:<12} {1:8.1f} ms {2:8.0f} bytes/instance'.format(
+            model_class.__name__, best * 1000,
+            memory_per_instance(model_class, items)))
+
+    texts = [item['id'] for item in items]
+    for label, field in (('UUID', micromodels.UUIDField()),
+                         ('compact', micromodels.UUIDField(compact=True))):
+        best = min(timeit.repeat(lambda: field.convert_many(texts), number=1,
+                                 repeat=args.repeat))
+        print('convert_many {0:<7} {1:8.1f} ms'.format(label, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
-from micromodels.models import Model
+from micromodels.models import Model, FrozenModel, FrozenInstanceError,\
+                    FieldError
 from micromodels.fields import BaseField, CharField, IntegerField, FloatField,\
                     BooleanField, DateTimeField, DateField, TimeField,\
                     ModelField, ModelCollectionField, FieldCollectionField,\
-                    UUIDField, DecimalField, JSONField, ValidationError
+                    UUIDField, DecimalField, JSONField, ChoiceField,\
+                    InternTable, ValidationError
 
 __version__ = '0.6.2'
@@ -0,0 +1,56 @@
+"""Compatibility between Python 2 and 3, and between the compiled and pure
+Python cores, chosen once at import time.
+
+On Python 3 the names below are the builtins themselves, so the conversions
+in :mod:`micromodels.fields` run without going through :mod:`six`, and
+:mod:`six` is not imported at all. Legacy interpreters keep using it.
+
+``core`` is the compiled build of :mod:`micromodels._core` if it was
+installed, unless the ``MICROMODELS_PURE_PYTHON`` environment variable is
+set, and the pure Python module otherwise.
+
+"""
+import os
+import sys
+
+PY2 = sys.version_info[0] == 2
+
+if PY2:
+    import six
+
+    text_type = six.text_type
+    #: A single class for ``isinstance`` checks of any kind of string.
+    string_type = basestring  # noqa: F821
+    integer_types = six.integer_types
+    to_text = six.u
+    add_metaclass = six.add_metaclass
+else:
+    text_type = str
+    string_type = str
+    integer_types = int
+
+    def to_text(value):
+        # six.u returns its argument unchanged on Python 3.
+        return value
+
+    def add_metaclass(metaclass):
+        '''Class decorator that recreates the class with ``metaclass``.'''
+        def wrapper(cls):
+            attrs = dict(cls.__dict__)
+            attrs.pop('__dict__', None)
+            attrs.pop('__weakref__', None)
+            return metaclass(cls.__name__, cls.__bases__, attrs)
+        return wrapper
+
+
+core = None
+if not os.environ.get('MICROMODELS_PURE_PYTHON'):
+    try:
+        from micromodels import _ccore as core
+    except ImportError:
+        pass
+if core is None:
+    from micromodels import _core as core
+
+#: Whether the compiled core is in use.
+COMPILED = core.__name__ == 'micromodels._ccore'
@@ -0,0 +1,98 @@
+"""The conversion loop shared by all models and fields.
+
+This module has no imports so that it can be compiled as it is. Setting
+``MICROMODELS_COMPILE=1`` when installing builds it with Cython as the
+extension ``micromodels._ccore``, which :mod:`micromodels._compat` imports
+in place of this module when it is available. Setting
+``MICROMODELS_PURE_PYTHON=1`` at runtime selects this module regardless.
+Both must behave identically.
+
+"""
+
+
+def identity(value):
+    return value
+
+
+def lookup_converter(converters, value_type):
+    '''Returns the converter for ``value_type`` from a dispatch table keyed
+    on input types, which must have an entry for :class:`object`. Subclasses
+    of the keys are resolved along their MRO, and the result is remembered
+    in the table so that later lookups are a single dictionary access.
+
+    '''
+    for base in value_type.__mro__:
+        converter = converters.get(base)
+        if converter is not None:
+            converters[value_type] = converter
+            return converter
+
+
+def convert(converters, value):
+    '''Converts ``value`` with the converter for its type.'''
+    converter = converters.get(type(value))
+    if converter is None:
+        converter = lookup_converter(converters, type(value))
+    return converter(value)
+
+
+def bool_from_text(value):
+    return value.strip().lower() == 'true'
+
+
+def bool_from_int(value):
+    return value > 0
+
+
+#: Returned by :func:`get_path` when the path does not exist.
+MISSING = object()
+
+
+def get_path(data, path):
+    '''Returns the value at ``path``, a tuple of keys and list indices, in
+    nested source data, or :data:`MISSING`. An integer also matches its
+    digits as a dictionary key, as JSON object keys are strings; the digits
+    are the original ``text`` of the integers parsed from dotted sources,
+    which keeps leading zeros.
+
+    '''
+    for key in path:
+        try:
+            data = data[key]
+        except (LookupError, TypeError):
+            if not (isinstance(key, int) and isinstance(data, dict)):
+                return MISSING
+            key = getattr(key, 'text', None) or str(key)
+            if key not in data:
+                return MISSING
+            data = data[key]
+    return data
+
+
+def to_python(field):
+    '''After being populated, this method casts the source data into a
+    Python object. If no data has been set, it returns the fields default
+    value.
+
+    '''
+    if getattr(field, 'data', None) is None:
+        if field.default is None:
+            return None
+        field.populate(field.get_default())
+    return field._to_python()
+
+
+def set_data(model, data, plan, fields):
+    '''Sets each field named in ``plan``, a sequence of (name, source key,
+    source path) tuples, from ``data`` or from the field's default. The path
+    is ``None`` for fields read from a single key.
+
+    '''
+    for name, key, path in plan:
+        if path is None:
+            value = data[key] if key in data else MISSING
+        else:
+            value = get_path(data, path)
+        if value is MISSING:
+            value = fields[name].get_default()
+        setattr(model, name, value)
@@ -0,0 +1,115 @@
+"""Asyncio support for streams of newline-delimited JSON (NDJSON) records.
+
+Decoding and encoding yield control back to the event loop every
+``yield_every`` records, so that a large batch cannot stall other tasks::
+
+    async def handle(reader, writer):
+        async for event in Event.aiter_jsonl(reader):
+            ...
+        await Event.awrite_jsonl(writer, events)
+
+Each record is yielded as soon as its line has been read. For models that
+are expensive to convert, pass an ``executor`` to decode or encode each
+group of ``yield_every`` records in a thread or process pool instead of on
+the event loop; records are then yielded a group at a time, or sooner when
+no further line has arrived yet.
+
+Note that :class:`asyncio.StreamReader` refuses lines longer than its
+``limit`` (64 KiB by default), so streams with larger records need a reader
+created with a larger limit.
+
+"""
+import asyncio
+
+
+def _decode_lines(model_class, lines):
+    return [model_class.from_dict(line, is_json=True) for line in lines]
+
+
+def _encode_instances(instances):
+    return b''.join((instance.to_json() + '\n').encode('utf-8')
+                    for instance in instances)
+
+
+def _has_line(reader):
+    # Whether reader already holds a complete line, so that the next
+    # readline does not wait for the peer. Only asyncio.StreamReader exposes
+    # its buffer; other readers are assumed to have nothing buffered.
+    buffer = getattr(reader, '_buffer', None)
+    return buffer is not None and b'\n' in buffer
+
+
+async def aiter_jsonl(model_class, reader, yield_every=100, executor=None):
+    '''Asynchronously yields a ``model_class`` instance for each line read
+    from ``reader``, an :class:`asyncio.StreamReader` or any object with a
+    ``readline`` coroutine. Blank lines are skipped.
+
+    '''
+    if executor is None:
+        count = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            yield model_class.from_dict(line, is_json=True)
+            count += 1
+            if count % yield_every == 0:
+                await asyncio.sleep(0)
+
+    loop = asyncio.get_running_loop()
+    lines = []
+    eof = False
+    while not eof:
+        line = await reader.readline()
+        if not line:
+            eof = True
+        elif line.strip():
+            lines.append(line)
+        # A partial batch is decoded once no further line has arrived, so
+        # that records are not held back waiting for more data.
+        if lines and (len(lines) >= yield_every or eof or
+                      not _has_line(reader)):
+            batch = await loop.run_in_executor(
+                executor, _decode_lines, model_class, lines)
+            for instance in batch:
+                yield instance
+            lines = []
+
+
+async def _chunks(instances, size):
+    chunk = []
+    if hasattr(instances, '__aiter__'):
+        async for instance in instances:
+            chunk.append(instance)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for instance in instances:
+            chunk.append(instance)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+async def awrite_jsonl(writer, instances, yield_every=100, executor=None):
+    '''Writes each model instance from ``instances`` (an iterable or
+    asynchronous iterable) as a line of JSON to ``writer``, an
+    :class:`asyncio.StreamWriter` or any object with ``write`` and a ``drain``
+    coroutine. The writer is drained every ``yield_every`` records.
+
+    '''
+    loop = asyncio.get_running_loop()
+    async for chunk in _chunks(instances, yield_every):
+        if executor is None:
+            data = _encode_instances(chunk)
+        else:
+            data = await loop.run_in_executor(
+                executor, _encode_instances, chunk)
+        writer.write(data)
+        await writer.drain()
+        await asyncio.sleep(0)
@@ -0,0 +1,346 @@
+"""Compact self-describing binary serialization in the MessagePack format.
+
+Unlike JSON, the encoding preserves :class:`datetime.datetime`,
+:class:`datetime.date`, :class:`datetime.time`, :class:`uuid.UUID` and
+:class:`decimal.Decimal` values as MessagePack extension types, so decoding
+a model hands native objects straight to its fields instead of re-parsing
+strings::
+
+    >>> import micromodels
+    >>> class Event(micromodels.Model):
+    ...     id = micromodels.UUIDField()
+    ...     at = micromodels.DateTimeField()
+    ...
+    >>> event = Event.from_dict({'id': '101469a9-4adb-492a-9d7f-88c9c039ceb4',
+    ...                          'at': '2010-07-13T14:01:00Z'})
+    >>> data = event.to_msgpack()
+    >>> Event.from_msgpack(data).at == event.at
+    True
+
+The `msgpack <https://pypi.org/project/msgpack/>`_ package is used when it
+is installed. Otherwise the pure Python implementation in this module is
+used; both produce identical bytes.
+
+"""
+import datetime
+import decimal
+import struct
+import uuid
+
+from micromodels.fields import ModelField, ModelCollectionField, \
+    FieldCollectionField, JSONField
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_TIME = 3
+EXT_UUID = 4
+EXT_DECIMAL = 5
+
+NATIVE_TYPES = (datetime.datetime, datetime.date, datetime.time, uuid.UUID,
+                decimal.Decimal)
+
+_DATETIME = struct.Struct('>HBBBBBI')
+_DATE = struct.Struct('>HBB')
+_TIME = struct.Struct('>BBBI')
+_OFFSET = struct.Struct('>i')
+
+
+def _encode_offset(value):
+    offset = value.utcoffset()
+    if offset is None:
+        return b''
+    return _OFFSET.pack(offset.days * 86400 + offset.seconds)
+
+
+def _decode_offset(data, offset):
+    if len(data) == offset:
+        return None
+    seconds = _OFFSET.unpack_from(data, offset)[0]
+    return datetime.timezone(datetime.timedelta(seconds=seconds))
+
+
+def encode_ext(value):
+    '''Returns the ``(type code, payload)`` extension pair for one of the
+    :data:`NATIVE_TYPES`, or ``None`` for any other value.
+
+    '''
+    # datetime must be checked before its date superclass.
+    if isinstance(value, datetime.datetime):
+        return EXT_DATETIME, _DATETIME.pack(
+            value.year, value.month, value.day, value.hour, value.minute,
+            value.second, value.microsecond) + _encode_offset(value)
+    if isinstance(value, datetime.date):
+        return EXT_DATE, _DATE.pack(value.year, value.month, value.day)
+    if isinstance(value, datetime.time):
+        return EXT_TIME, _TIME.pack(value.hour, value.minute, value.second,
+                                    value.microsecond) + _encode_offset(value)
+    if isinstance(value, uuid.UUID):
+        return EXT_UUID, value.bytes
+    if isinstance(value, decimal.Decimal):
+        return EXT_DECIMAL, str(value).encode('ascii')
+    return None
+
+
+def decode_ext(code, data):
+    '''Builds the native value for an extension pair produced by
+    :func:`encode_ext`. Unknown type codes raise ``ValueError``.
+
+    '''
+    if code == EXT_DATETIME:
+        parts = _DATETIME.unpack_from(data)
+        return datetime.datetime(*parts,
+                                 tzinfo=_decode_offset(data, _DATETIME.size))
+    if code == EXT_DATE:
+        return datetime.date(*_DATE.unpack(data))
+    if code == EXT_TIME:
+        parts = _TIME.unpack_from(data)
+        return datetime.time(*parts, tzinfo=_decode_offset(data, _TIME.size))
+    if code == EXT_UUID:
+        return uuid.UUID(bytes=bytes(data))
+    if code == EXT_DECIMAL:
+        return decimal.Decimal(bytes(data).decode('ascii'))
+    raise ValueError('Unknown extension type {0}'.format(code))
+
+
+class _Encoder(object):
+
+    def __init__(self):
+        self.chunks = []
+
+    def _header(self, length, fix_tag, fix_limit, tags):
+        # tags are the 8, 16 and 32 bit length variants, or None where the
+        # format has no such variant.
+        write = self.chunks.append
+        if length < fix_limit:
+            write(struct.pack('B', fix_tag | length))
+        elif length < 0x100 and tags[0] is not None:
+            write(struct.pack('>BB', tags[0], length))
+        elif length < 0x10000:
+            write(struct.pack('>BH', tags[1], length))
+        elif length < 0x100000000:
+            write(struct.pack('>BI', tags[2], length))
+        else:
+            raise ValueError('Object too large to encode')
+
+    def _int(self, value):
+        write = self.chunks.append
+        if 0 <= value < 0x80 or -0x20 <= value < 0:
+            write(struct.pack('b' if value < 0 else 'B', value))
+        elif value >= 0:
+            if value < 0x100:
+                write(struct.pack('>BB', 0xcc, value))
+            elif value < 0x10000:
+                write(struct.pack('>BH', 0xcd, value))
+            elif value < 0x100000000:
+                write(struct.pack('>BI', 0xce, value))
+            elif value < 0x10000000000000000:
+                write(struct.pack('>BQ', 0xcf, value))
+            else:
+                raise OverflowError('Integer too large to encode')
+        elif value >= -0x80:
+            write(struct.pack('>Bb', 0xd0, value))
+        elif value >= -0x8000:
+            write(struct.pack('>Bh', 0xd1, value))
+        elif value >= -0x80000000:
+            write(struct.pack('>Bi', 0xd2, value))
+        elif value >= -0x8000000000000000:
+            write(struct.pack('>Bq', 0xd3, value))
+        else:
+            raise OverflowError('Integer too large to encode')
+
+    def _ext(self, code, payload):
+        length = len(payload)
+        fixed = {1: 0xd4, 2: 0xd5, 4: 0xd6, 8: 0xd7, 16: 0xd8}.get(length)
+        if fixed is not None:
+            self.chunks.append(struct.pack('>Bb', fixed, code))
+        else:
+            self._header(length, 0, 0, (0xc7, 0xc8, 0xc9))
+            self.chunks.append(struct.pack('b', code))
+        self.chunks.append(payload)
+
+    def encode(self, value):
+        write = self.chunks.append
+        if value is None:
+            write(b'\xc0')
+        elif value is True:
+            write(b'\xc3')
+        elif value is False:
+            write(b'\xc2')
+        elif isinstance(value, int):
+            self._int(value)
+        elif isinstance(value, float):
+            write(struct.pack('>Bd', 0xcb, value))
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+            self._header(len(data), 0xa0, 32, (0xd9, 0xda, 0xdb))
+            write(data)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            data = bytes(value)
+            self._header(len(data), 0, 0, (0xc4, 0xc5, 0xc6))
+            write(data)
+        elif isinstance(value, (list, tuple)):
+            self._header(len(value), 0x90, 16, (None, 0xdc, 0xdd))
+            for item in value:
+                self.encode(item)
+        elif isinstance(value, dict):
+            self._header(len(value), 0x80, 16, (None, 0xde, 0xdf))
+            for key, item in value.items():
+                self.encode(key)
+                self.encode(item)
+        else:
+            ext = encode_ext(value)
+            if ext is None:
+                raise TypeError('Cannot encode {0!r}'.format(value))
+            self._ext(*ext)
+
+
+def _pure_dumps(value):
+    encoder = _Encoder()
+    encoder.encode(value)
+    return b''.join(encoder.chunks)
+
+
+class _Decoder(object):
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def _unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values[0]
+
+    def _bytes(self, length):
+        start = self.offset
+        self.offset += length
+        if self.offset > len(self.data):
+            raise ValueError('Truncated data')
+        return self.data[start:self.offset]
+
+    def _array(self, length):
+        return [self.decode() for _ in range(length)]
+
+    def _map(self, length):
+        result = {}
+        for _ in range(length):
+            key = self.decode()
+            result[key] = self.decode()
+        return result
+
+    def _ext(self, length):
+        code = self._unpack('b')
+        return decode_ext(code, self._bytes(length))
+
+    def decode(self):
+        tag = self._unpack('B')
+        if tag < 0x80:
+            return tag
+        if tag >= 0xe0:
+            return tag - 0x100
+        if tag < 0x90:
+            return self._map(tag & 0x0f)
+        if tag < 0xa0:
+            return self._array(tag & 0x0f)
+        if tag < 0xc0:
+            return str(self._bytes(tag & 0x1f), 'utf-8')
+        if tag == 0xc0:
+            return None
+        if tag == 0xc2:
+            return False
+        if tag == 0xc3:
+            return True
+        if tag in _FIXED_FORMATS:
+            return self._unpack(_FIXED_FORMATS[tag])
+        if tag in _LENGTH_FORMATS:
+            fmt, kind = _LENGTH_FORMATS[tag]
+            length = self._unpack(fmt)
+            if kind == 'str':
+                return str(self._bytes(length), 'utf-8')
+            if kind == 'bin':
+                return bytes(self._bytes(length))
+            if kind == 'array':
+                return self._array(length)
+            if kind == 'map':
+                return self._map(length)
+            return self._ext(length)
+        if 0xd4 <= tag <= 0xd8:
+            return self._ext(1 << (tag - 0xd4))
+        raise ValueError('Invalid type tag 0x{0:02x}'.format(tag))
+
+
+_FIXED_FORMATS = {
+    0xca: '>f', 0xcb: '>d',
+    0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+    0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q',
+}
+
+_LENGTH_FORMATS = {
+    0xc4: ('>B', 'bin'), 0xc5: ('>H', 'bin'), 0xc6: ('>I', 'bin'),
+    0xc7: ('>B', 'ext'), 0xc8: ('>H', 'ext'), 0xc9: ('>I', 'ext'),
+    0xd9: ('>B', 'str'), 0xda: ('>H', 'str'), 0xdb: ('>I', 'str'),
+    0xdc: ('>H', 'array'), 0xdd: ('>I', 'array'),
+    0xde: ('>H', 'map'), 0xdf: ('>I', 'map'),
+}
+
+
+def _pure_loads(data):
+    decoder = _Decoder(data)
+    value = decoder.decode()
+    if decoder.offset != len(decoder.data):
+        raise ValueError('Extra data after encoded value')
+    return value
+
+
+def _msgpack_default(value):
+    ext = encode_ext(value)
+    if ext is None:
+        raise TypeError('Cannot encode {0!r}'.format(value))
+    return msgpack.ExtType(*ext)
+
+
+def _msgpack_dumps(value):
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_loads(data):
+    return msgpack.unpackb(data, raw=False, strict_map_key=False,
+                           ext_hook=decode_ext)
+
+
+if msgpack is not None:
+    dumps, loads = _msgpack_dumps, _msgpack_loads
+else:
+    dumps, loads = _pure_dumps, _pure_loads
+
+
+def _native_value(field, value):
+    if value is None:
+        return None
+    if isinstance(field, ModelField):
+        return native_dict(value)
+    if isinstance(field, ModelCollectionField):
+        return [native_dict(item) for item in value]
+    if isinstance(field, FieldCollectionField):
+        return [_native_value(field._instance, item) for item in value]
+    # JSONField values are plain JSON structures already, and the extension
+    # types need no string serialization.
+    if isinstance(field, JSONField) or isinstance(value, NATIVE_TYPES):
+        return value
+    return field.to_serial(value)
+
+
+def native_dict(instance):
+    '''Like :meth:`~micromodels.Model.to_dict` with ``serial=True``, but
+    values of the :data:`NATIVE_TYPES` are kept as they are.
+
+    '''
+    fields = instance._fields
+    return dict((key, _native_value(fields[key], getattr(instance, key)))
+                for key in fields.keys() if hasattr(instance, key))
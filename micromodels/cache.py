@@ -0,0 +1,101 @@
+"""Bounded LRU cache of decoded model instances.
+
+A model enables the cache by declaring its size on its ``Meta`` class::
+
+    >>> import micromodels
+    >>> class Profile(micromodels.Model):
+    ...     name = micromodels.CharField()
+    ...
+    ...     class Meta:
+    ...         decode_cache = 10000
+    ...
+
+Each class then keeps its own :class:`DecodeCache`, which
+:meth:`~micromodels.Model.from_dict` consults before decoding. JSON payloads
+are looked up by their raw text and dictionaries by their contents, so a
+repeated payload skips both JSON parsing and all field conversion.
+
+"""
+import threading
+from collections import namedtuple, OrderedDict
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+def freeze(value):
+    '''Returns a hashable equivalent of a decoded JSON-like structure.
+    Raises ``TypeError`` for values that cannot be used as a key.
+
+    '''
+    if isinstance(value, dict):
+        return (dict, frozenset((key, freeze(item))
+                                for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(freeze(item) for item in value))
+    hash(value)
+    # Keep values that compare equal across types, like 1 and True, apart.
+    return (type(value), value)
+
+
+class DecodeCache(object):
+    """A thread-safe LRU mapping of payloads to decoded instances."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, data, is_json=False):
+        '''Returns the cache key for a payload, or ``None`` if the payload
+        cannot be cached.
+
+        '''
+        if is_json:
+            return data
+        try:
+            return freeze(data)
+        except TypeError:
+            return None
+
+    def get(self, key):
+        '''Returns the instance cached for ``key`` and marks it as the most
+        recently used, or ``None`` if there is none.
+
+        '''
+        with self._lock:
+            instance = self._entries.pop(key, None)
+            if instance is None:
+                self.misses += 1
+                return None
+            self._entries[key] = instance
+            self.hits += 1
+            return instance
+
+    def put(self, key, instance):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = instance
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, data, is_json=False):
+        '''Removes the instance cached for a payload, if any.'''
+        key = self.key(data, is_json)
+        if key is not None:
+            with self._lock:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        '''Removes all cached instances and resets the counters.'''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._entries))
@@ -1,9 +1,43 @@
 import datetime
-import decimal
-import aniso8601
-import uuid
-import json
-import six
+import importlib
+import weakref
+
+from micromodels._compat import core, integer_types, string_type, \
+    text_type, to_text
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+
+# These modules are only needed by a few field types, so they are imported
+# by _module on first use to keep ``import micromodels`` fast.
+aniso8601 = None
+decimal = None
+json = None
+uuid = None
+
+
+def _module(name):
+    module = globals()[name]
+    if module is None:
+        module = importlib.import_module(name)
+        globals()[name] = module
+    return module
+
+
+def json_default(value):
+    '''``default`` function for :func:`json.dumps`, writing the
+    :class:`~decimal.Decimal` numbers that a model with ``parse_float``
+    leaves in fields such as :class:`BaseField` as strings, like
+    :class:`DecimalField` does, so that no precision is lost.
+
+    '''
+    if isinstance(value, _module('decimal').Decimal):
+        return str(value)
+    raise TypeError('Object of type {0} is not JSON serializable'
+                    .format(type(value).__name__))
 
 
 class ValidationError(Exception):
@@ -15,6 +49,35 @@ def required_validator(value):
         raise ValidationError('This field is required.')
 
 
+lookup_converter = core.lookup_converter
+
+
+class PathIndex(int):
+    """A numeric part of a dotted ``source``, which indexes lists as an
+    integer and is looked up in dictionaries by its original ``text``, such
+    as ``'007'``.
+
+    """
+
+    def __new__(cls, text):
+        index = super(PathIndex, cls).__new__(cls, text)
+        index.text = text
+        return index
+
+
+def source_path(source):
+    '''Returns the path of keys named by a field's ``source`` as a tuple,
+    or ``None`` if it names a single key.
+
+    '''
+    if isinstance(source, (tuple, list)):
+        return tuple(source)
+    if isinstance(source, string_type) and '.' in source:
+        return tuple(PathIndex(part) if part.isdigit() else part
+                     for part in source.split('.'))
+    return None
+
+
 class BaseField(object):
     """Base class for all field types.
 
@@ -22,11 +85,21 @@ class BaseField(object):
     data. If ``source`` is not specified, the field instance will use its own
     name as the key to retrieve the value from the source data.
 
+    ``source`` can also be the path to a value nested in the source data,
+    either as a dotted string such as ``'user.emails.0'``, whose numeric
+    parts are list indices or, in dictionaries, string keys of the same
+    digits, or as a tuple of keys and indices such as
+    ``('user', 'emails', 0)``. Use a tuple to read a single key that contains
+    a dot, like ``('user.name',)``. If any key along the path is missing, the
+    field gets its default.
+
     """
 
     # Tracks each time a BaseField instance is created. Used to retain order.
     creation_counter = 0
     builtin_validators = []
+    # Set by fields whose models refer back to the model holding them.
+    _related_name = None
 
     def __init__(self, source=None, default=None, required=True,
                  help_text=None, verbose_name=None, validators=None):
@@ -48,30 +121,35 @@ class BaseField(object):
         self.creation_counter = BaseField.creation_counter
         BaseField.creation_counter += 1
 
+    def __copy__(self):
+        # Models copy every field for each instance, so avoid the generic
+        # (and much slower) copy protocol.
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        return clone
+
     def populate(self, data):
         """Set the value or values wrapped by this field"""
         if callable(data):
             data = data()
         self.data = data
 
+    def descriptor(self, name):
+        '''Returns a data descriptor that the model class installs under the
+        field's ``name``, or ``None``. Descriptors see the converted values
+        stored in each instance's ``__dict__`` and may present them
+        differently.
+
+        '''
+        return None
+
     def get_default(self):
         """Get the default value. If the default is callable, call it."""
         if callable(self.default):
             return self.default()
         return self.default
 
-    def to_python(self):
-        '''After being populated, this method casts the source data into a
-        Python object. If no data has been set, it returns the fields default
-        value.
-
-        '''
-        if not hasattr(self, 'data') or self.data is None:
-            if self.default is None:
-                return None
-            self.populate(self.get_default())
-        assert hasattr(self, 'data')
-        return self._to_python()
+    to_python = core.to_python
 
     def _to_python(self):
         '''After being populated, this method casts the source data into a
@@ -104,17 +182,117 @@ class BaseField(object):
         return value
 
 
+class InternTable(object):
+    """A bounded table of canonical string instances.
+
+    Equal strings passed to :meth:`intern` are replaced by the first instance
+    seen, so that many model instances holding the same value share a single
+    object. Once ``maxsize`` strings are held, new strings are returned as
+    they are; strings longer than ``max_length`` are never interned.
+
+    """
+
+    def __init__(self, maxsize=10000, max_length=64):
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self._table = {}
+
+    def __len__(self):
+        return len(self._table)
+
+    def intern(self, value):
+        if len(value) > self.max_length:
+            return value
+        if len(self._table) < self.maxsize:
+            return self._table.setdefault(value, value)
+        return self._table.get(value, value)
+
+    def clear(self):
+        self._table.clear()
+
+
+#: The table used by fields created with ``intern=True``.
+default_intern_table = InternTable()
+
+
 class CharField(BaseField):
-    """Field to represent a simple Unicode string value."""
+    """Field to represent a simple Unicode string value.
+
+    If ``intern`` is ``True``, converted strings are looked up in
+    :data:`default_intern_table`, so that repeated values share one object.
+    An :class:`InternTable` can be passed instead to use a separate table.
+    Setting ``intern_strings`` on a model's ``Meta`` class has the same
+    effect for all of its character fields that do not set ``intern``.
+
+    """
+
+    #: Converters for source values, keyed on their exact type. Text is
+    #: returned as it is, and other values go through :func:`six.u` on
+    #: Python 2.
+    converters = {
+        text_type: core.identity,
+        object: to_text,
+    }
+
+    def __init__(self, intern=None, **kwargs):
+        super(CharField, self).__init__(**kwargs)
+        self.set_intern(intern)
+
+    def set_intern(self, intern):
+        self.intern = intern
+        if intern is True:
+            self._intern_table = default_intern_table
+        elif intern is None or intern is False:
+            self._intern_table = None
+        else:
+            self._intern_table = intern
 
     def _to_python(self):
         """Convert the data supplied using the :meth:`populate` method to a
         Unicode string.
 
         """
-        if isinstance(self.data, six.text_type):
-            return self.data
-        return six.u(self.data)
+        data = core.convert(self.converters, self.data)
+        if self._intern_table is not None and \
+                isinstance(data, text_type):
+            return self._intern_table.intern(data)
+        return data
+
+
+class ChoiceField(BaseField):
+    """Field restricted to a fixed set of values.
+
+    ``choices`` is either an iterable of allowed values or an
+    :class:`enum.Enum` subclass. Converted values are always the shared
+    objects from ``choices`` (or the members of the enum, looked up by
+    value), so instances holding the same choice hold the same object.
+    Values that are not valid choices raise ``ValueError``.
+
+    """
+
+    def __init__(self, choices, **kwargs):
+        super(ChoiceField, self).__init__(**kwargs)
+        members = getattr(choices, '__members__', None)
+        if members is not None:
+            self._is_enum = True
+            self._choices = dict((member.value, member)
+                                 for member in members.values())
+            self._choices.update((member, member)
+                                 for member in members.values())
+        else:
+            self._is_enum = False
+            self._choices = dict((choice, choice) for choice in choices)
+
+    def _to_python(self):
+        try:
+            return self._choices[self.data]
+        except (KeyError, TypeError):
+            raise ValueError('{0!r} is not a valid choice'.format(self.data))
+
+    def _to_serial(self, choice):
+        if self._is_enum:
+            return choice.value
+        return choice
 
 
 class IntegerField(BaseField):
@@ -140,34 +318,85 @@ class FloatField(BaseField):
 
 
 class DecimalField(BaseField):
-    """Field to represent a :mod:`decimal.Decimal`"""
+    """Field to represent a :mod:`decimal.Decimal`
+
+    If ``places`` is set, values are quantized to that many decimal places,
+    using ``rounding`` (one of the :mod:`decimal` rounding modes) or the
+    rounding of the context. ``context`` is an optional
+    :class:`decimal.Context` used to convert and round values instead of the
+    current thread's context. Values are serialized as strings, so that no
+    precision is lost.
+
+    Floats are converted through their shortest representation. To avoid
+    floats altogether when decoding JSON, set ``parse_float =
+    decimal.Decimal`` on the model's ``Meta`` class.
+
+    """
+
+    def __init__(self, places=None, rounding=None, context=None, **kwargs):
+        super(DecimalField, self).__init__(**kwargs)
+        self.places = places
+        self.rounding = rounding
+        self.context = context
+        # Computed once here rather than for every value.
+        if places is None:
+            self._quantum = None
+        else:
+            self._quantum = _module('decimal').Decimal(1).scaleb(-places)
 
     def _to_python(self):
-        if isinstance(self.data, decimal.Decimal):
-            return self.data
-        if isinstance(self.data, float):
-            return decimal.Decimal(repr(self.data))
-        return decimal.Decimal(self.data)
+        decimal = _module('decimal')
+        data = self.data
+        context = self.context
+        if isinstance(data, float):
+            data = repr(data)
+        if context is not None:
+            data = context.create_decimal(data)
+        elif not isinstance(data, decimal.Decimal):
+            data = decimal.Decimal(data)
+        if self._quantum is not None:
+            data = data.quantize(self._quantum, rounding=self.rounding,
+                                 context=context)
+        return data
+
+    def _to_serial(self, data):
+        return str(data)
 
 
 class BooleanField(BaseField):
     """Field to represent a boolean"""
 
+    #: Converters for source values, keyed on their exact type. Values of
+    #: other types are converted with :func:`bool`.
+    converters = {
+        bool: core.identity,
+        int: core.bool_from_int,
+        string_type: core.bool_from_text,
+        object: bool,
+    }
+
     def populate(self, data):
-        # Explicitly cast the value to a bool when we populate the field
-        super(BooleanField, self).populate(data)
-        self.data = bool(self.to_python())
+        # Explicitly cast the value to a bool when we populate the field, so
+        # that to_python only has to return it. Missing values become the
+        # converted default, or False.
+        if callable(data):
+            data = data()
+        if data is None:
+            data = self.get_default()
+        if data is None:
+            self.data = False
+        else:
+            self.data = self._convert(data)
+
+    def _convert(self, data):
+        return core.convert(self.converters, data)
 
     def _to_python(self):
         """The string ``'True'`` (case insensitive) will be converted
         to ``True``, as will any positive integers.
 
         """
-        if isinstance(self.data, six.string_types):
-            return self.data.strip().lower() == 'true'
-        if isinstance(self.data, int):
-            return self.data > 0
-        return bool(self.data)
+        return self._convert(self.data)
 
 
 class DateTimeField(BaseField):
@@ -193,7 +422,7 @@ class DateTimeField(BaseField):
             return self.data
         elif self.format is None:
             # parse as iso8601
-            return aniso8601.parse_datetime(self.data)
+            return _module('aniso8601').parse_datetime(self.data)
         else:
             return datetime.datetime.strptime(self.data, self.format)
 
@@ -211,7 +440,7 @@ class DateField(DateTimeField):
         if isinstance(self.data, datetime.date):
             return self.data
         elif self.format is None:
-            return aniso8601.parse_date(self.data)
+            return _module('aniso8601').parse_date(self.data)
 
         return super(DateField, self)._to_python().date()
 
@@ -221,24 +450,105 @@ class TimeField(DateTimeField):
 
     def _to_python(self):
         # don't parse data that is already native
-        if isinstance(self.data, datetime.datetime):
+        if isinstance(self.data, (datetime.time, datetime.datetime)):
             return self.data
         elif self.format is None:
             # parse as iso8601
-            return aniso8601.parse_time(self.data)
+            return _module('aniso8601').parse_time(self.data)
         else:
             return datetime.datetime.strptime(self.data, self.format).time()
 
 
+def uuid_int(text):
+    '''Returns the 128-bit integer of a UUID string, accepting the same
+    forms as :class:`uuid.UUID` without building one.
+
+    '''
+    text = text.replace('urn:', '').replace('uuid:', '')
+    text = text.strip('{}').replace('-', '')
+    if len(text) != 32:
+        raise ValueError('badly formed hexadecimal UUID string')
+    return int(text, 16)
+
+
+class CompactUUID(object):
+    """Data descriptor presenting the integer stored by a compact
+    :class:`UUIDField` as a :class:`uuid.UUID`, built on each access.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        attrs = instance.__dict__
+        if self.name not in attrs:
+            # Let the model fill in the default.
+            instance.__getattr__(self.name)
+        value = attrs.get(self.name)
+        if isinstance(value, integer_types):
+            return _module('uuid').UUID(int=value)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+
 class UUIDField(BaseField):
-    """Field to represent a :mod:`uuid.UUID`"""
+    """Field to represent a :mod:`uuid.UUID`
+
+    If ``compact`` is ``True``, instances store the 128-bit integer of the
+    UUID, which takes much less memory than a :class:`uuid.UUID`, and build
+    the :class:`~uuid.UUID` when the attribute is read. Strings are then
+    converted without building a :class:`~uuid.UUID` at all. This only
+    applies to fields declared on a model class; fields added with
+    :meth:`~micromodels.Model.add_field` store :class:`~uuid.UUID` objects.
+
+    """
+    # Whether converted values are integers, which is only the case for
+    # compact fields whose model class has installed their descriptor.
+    _packed = False
+
+    def __init__(self, compact=False, **kwargs):
+        super(UUIDField, self).__init__(**kwargs)
+        self.compact = compact
+
+    def descriptor(self, name):
+        if not self.compact:
+            return None
+        self._packed = True
+        return CompactUUID(name)
 
     def _to_python(self):
-        if isinstance(self.data, uuid.UUID):
-            return self.data
-        return uuid.UUID(self.data)
+        uuid = _module('uuid')
+        data = self.data
+        if not self._packed:
+            if isinstance(data, uuid.UUID):
+                return data
+            return uuid.UUID(data)
+        if isinstance(data, string_type):
+            return uuid_int(data)
+        if isinstance(data, uuid.UUID):
+            return data.int
+        if isinstance(data, integer_types) and 0 <= data < 1 << 128:
+            return data
+        raise ValueError('Cannot convert {0!r} to a UUID'.format(data))
+
+    def convert_many(self, hex_strings):
+        '''Converts a sequence of UUID strings at once, returning a list of
+        :class:`uuid.UUID` objects, or of integers if the field is compact.
+
+        '''
+        if self.compact:
+            return [uuid_int(text) for text in hex_strings]
+        make_uuid = _module('uuid').UUID
+        return [make_uuid(text) for text in hex_strings]
 
     def _to_serial(self, uuid_obj):
+        if isinstance(uuid_obj, integer_types):
+            return '{0:032x}'.format(uuid_obj)
         return uuid_obj.hex
 
 
@@ -246,24 +556,50 @@ class JSONField(BaseField):
     """Field to represent a dict or list as a JSON string."""
 
     def _to_python(self):
-        if isinstance(self.data, six.string_types):
-            return json.loads(self.data)
+        if isinstance(self.data, string_type):
+            return _module('json').loads(self.data)
         return self.data
 
     def _to_serial(self, obj):
-        return json.dumps(obj)
+        return _module('json').dumps(obj, default=json_default)
 
 
 class WrappedObjectField(BaseField):
     """Superclass for any fields that wrap an object"""
 
     def __init__(self, wrapped_class, related_name=None, **kwargs):
+        meta = getattr(wrapped_class, '_meta', None)
+        if related_name is not None and getattr(meta, 'frozen', False):
+            raise TypeError('related_name cannot be set on frozen model {0}'
+                            .format(wrapped_class.__name__))
         self._wrapped_class = wrapped_class
         self._related_name = related_name
-        self._related_obj = None
+        self._related_ref = None
 
         BaseField.__init__(self, **kwargs)
 
+    @property
+    def _related_obj(self):
+        # The model holding this field, referenced weakly so that it does
+        # not form a cycle with the models it holds.
+        ref = self._related_ref
+        return None if ref is None else ref()
+
+    @_related_obj.setter
+    def _related_obj(self, obj):
+        self._related_ref = None if obj is None else weakref.ref(obj)
+
+    def __getstate__(self):
+        # Weak references cannot be pickled, so the related object is saved
+        # in their place and referenced weakly again when loaded.
+        state = dict(self.__dict__)
+        state['_related_ref'] = self._related_obj
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._related_obj = state['_related_ref']
+
 
 class ModelField(WrappedObjectField):
     """Field containing a model instance
@@ -312,7 +648,7 @@ class ModelField(WrappedObjectField):
 
         # Set the related object to the related field
         if self._related_name is not None:
-            setattr(obj, self._related_name, self._related_obj)
+            obj._set_backref(self._related_name, self._related_obj)
 
         return obj
 
@@ -353,12 +689,24 @@ class ModelCollectionField(WrappedObjectField):
         >>> [item.value for item in m.list]
         [u'First value', u'Second value', u'Third value']
 
+    If ``lazy`` is ``True``, the field holds a :class:`LazyModelList`
+    instead of a list, and items are only converted when they are accessed.
+
     """
     def __init__(self, *args, **kwargs):
+        self.lazy = kwargs.pop('lazy', False)
         kwargs.setdefault('default', list)
         super(ModelCollectionField, self).__init__(*args, **kwargs)
 
     def _to_python(self):
+        if self.lazy:
+            if isinstance(self.data, LazyModelList):
+                return self.data
+            data = self.data
+            if not isinstance(data, (list, tuple)):
+                data = list(data)
+            return LazyModelList(data, self._wrapped_class,
+                                 self._related_name, self._related_obj)
         object_list = []
         for item in self.data:
             if isinstance(item, self._wrapped_class):
@@ -366,15 +714,151 @@ class ModelCollectionField(WrappedObjectField):
             else:
                 obj = self._wrapped_class.from_dict(item)
             if self._related_name is not None:
-                setattr(obj, self._related_name, self._related_obj)
+                obj._set_backref(self._related_name, self._related_obj)
             object_list.append(obj)
 
         return object_list
 
     def _to_serial(self, model_instances):
+        if isinstance(model_instances, LazyModelList):
+            return model_instances.to_serial()
         return [instance.to_dict(serial=True) for instance in model_instances]
 
 
+def serial_names(model_class):
+    '''Returns the field names of ``model_class`` if it serializes source
+    data with those keys unchanged, or ``None``. This is computed once per
+    class.
+
+    '''
+    try:
+        return model_class.__dict__['_serial_names']
+    except KeyError:
+        pass
+    names = frozenset(model_class._clsfields)
+    for field in model_class._clsfields.values():
+        if (type(field) is not BaseField or field.source or
+                field.default is not None):
+            names = None
+            break
+    model_class._serial_names = names
+    return names
+
+
+class LazyModelList(Sequence):
+    """Read-only sequence of model instances, converted from the source list
+    on first access and then kept.
+
+    Slicing returns another :class:`LazyModelList` sharing the source data
+    and the items converted so far, without converting the others.
+
+    """
+
+    def __init__(self, data, wrapped_class, related_name=None,
+                 related_obj=None, items=None):
+        self._data = data
+        self._wrapped_class = wrapped_class
+        self._related_name = related_name
+        self._related_ref = (None if related_obj is None
+                             else weakref.ref(related_obj))
+        self._items = items if items is not None else [None] * len(data)
+
+    @property
+    def _related_obj(self):
+        ref = self._related_ref
+        return None if ref is None else ref()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_related_ref'] = self._related_obj
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        obj = state['_related_ref']
+        self._related_ref = None if obj is None else weakref.ref(obj)
+
+    def _convert(self, index):
+        item = self._data[index]
+        if not isinstance(item, self._wrapped_class):
+            item = self._wrapped_class.from_dict(item)
+        if self._related_name is not None:
+            item._set_backref(self._related_name, self._related_obj)
+        self._items[index] = item
+        return item
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyModelList(self._data[index], self._wrapped_class,
+                                 self._related_name, self._related_obj,
+                                 self._items[index])
+        item = self._items[index]
+        if item is None:
+            item = self._convert(index)
+        return item
+
+    def __iter__(self):
+        for index in range(len(self._data)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, LazyModelList)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            mine == theirs for mine, theirs in zip(self, other))
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<LazyModelList of {0} {1}>'.format(
+            len(self), self._wrapped_class.__name__)
+
+    def decoded(self):
+        '''Returns the items that have been converted so far.'''
+        return [item for item in self._items if item is not None]
+
+    def to_serial(self):
+        '''Serializes the items like a list of models. The source data of
+        items that have not been converted is returned as it was received
+        when it would serialize to the same thing, which is when the wrapped
+        class has only plain :class:`BaseField` fields without a ``source``
+        or a default, and the data has a key for each of them and no other; the other
+        items are converted first.
+
+        '''
+        names = serial_names(self._wrapped_class)
+        result = []
+        for index, data in enumerate(self._data):
+            if (self._items[index] is None and names is not None and
+                    isinstance(data, dict) and len(data) == len(names) and
+                    all(name in data for name in names)):
+                result.append(data)
+            else:
+                result.append(self[index].to_dict(serial=True))
+        return result
+
+    def copy(self, related_obj=None):
+        '''Returns a copy with independent copies of the converted items,
+        whose related object (if any) is ``related_obj``.
+
+        '''
+        items = [None if item is None else item._clone()
+                 for item in self._items]
+        copied = LazyModelList(self._data, self._wrapped_class,
+                               self._related_name, related_obj, items)
+        if self._related_name is not None:
+            for item in copied.decoded():
+                item._set_backref(self._related_name, related_obj)
+        return copied
+
+
 class FieldCollectionField(BaseField):
     """Field containing a list of the same type of fields.
 
@@ -1,8 +1,162 @@
-import json
-from copy import copy
-from collections import OrderedDict
-from six import add_metaclass
-from micromodels.fields import BaseField, ValidationError
+import sys
+import weakref
+from copy import copy, deepcopy
+from collections import namedtuple, OrderedDict
+from micromodels._compat import add_metaclass, core, text_type
+from micromodels.fields import BaseField, CharField, ModelField,\
+    ModelCollectionField, LazyModelList, ValidationError, json_default,\
+    source_path, _module
+
+
+if sys.version_info < (3, 7):
+    # Modules cannot define __getattr__ before Python 3.7 (PEP 562), so json
+    # is imported eagerly to keep it available as an attribute of this module.
+    import json  # noqa: F401
+else:
+    def __getattr__(name):
+        # json is imported on first use, like the optional modules of
+        # micromodels.fields, but stays available as an attribute of this
+        # module.
+        if name == 'json':
+            return _module(name)
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(
+            __name__, name))
+
+
+#: Maximum number of projections (see :meth:`Model.from_dict`) compiled and
+#: kept per model class; the oldest is discarded to make room for a new one.
+MAX_PROJECTIONS = 256
+
+
+#: An error found by :meth:`Model.validate_many`. ``path`` is a JSON pointer
+#: to the offending value in the source records, such as ``/3/author/name``.
+FieldError = namedtuple('FieldError', 'path message')
+
+
+def pointer(path, key):
+    """Appends ``key``, or each key of a tuple of keys, to the JSON pointer
+    ``path``.
+
+    """
+    for part in key if isinstance(key, tuple) else (key,):
+        path += '/' + text_type(part).replace('~', '~0').replace('/', '~1')
+    return path
+
+
+class ErrorCollector(object):
+    """Collects :data:`FieldError` tuples up to a maximum number."""
+
+    def __init__(self, max_errors=None):
+        self.errors = []
+        self.max_errors = max_errors
+
+    @property
+    def full(self):
+        return (self.max_errors is not None and
+                len(self.errors) >= self.max_errors)
+
+    def add(self, path, message):
+        if not self.full:
+            self.errors.append(FieldError(path, message))
+
+
+def patched_value(partial, path):
+    """Returns the value that the JSON Merge Patch ``partial`` gives the
+    value at ``path``: :data:`~micromodels._core.MISSING` if the patch leaves
+    it unchanged, or ``None`` if it removes it. Objects along the path are
+    merged, while a ``null`` or any other value replaces the whole subtree,
+    so the value is removed unless the replacement contains it.
+
+    """
+    data = partial
+    merging = True
+    for key in path:
+        if data is None:
+            return None
+        merging = merging and isinstance(data, dict)
+        data = core.get_path(data, (key,))
+        if data is core.MISSING:
+            return core.MISSING if merging else None
+    return data
+
+
+def split_names(names):
+    """Maps the first part of each dotted name in ``names`` to the set of
+    the remaining parts, which contains ``None`` for undotted names.
+
+    """
+    heads = {}
+    for name in names:
+        head, _, tail = name.partition('.')
+        heads.setdefault(head, set()).add(tail or None)
+    return heads
+
+
+class Projection(object):
+    """The fields of a model class selected by ``only`` and ``exclude``
+    names, compiled once per class and set of names by
+    :meth:`Model._projection`.
+
+    """
+
+    def __init__(self, model_class, only=None, exclude=None):
+        only = None if only is None else split_names(only)
+        exclude = {} if exclude is None else split_names(exclude)
+        fields = []
+        plan = []
+        nested = []
+        for name, key, path in model_class._decode_plan():
+            if only is not None and name not in only:
+                continue
+            child_only = None
+            if only is not None and None not in only[name]:
+                child_only = only[name]
+            child_exclude = exclude.get(name)
+            if child_exclude is not None and None in child_exclude:
+                continue
+            if child_only is None and child_exclude is None:
+                fields.append((name, None))
+                plan.append((name, key, path))
+                continue
+            field = model_class._clsfields[name]
+            if not isinstance(field, (ModelField, ModelCollectionField)):
+                raise ValueError("Field '{0}' of {1} has no nested fields"
+                                 .format(name, model_class.__name__))
+            child = field._wrapped_class._projection(child_only,
+                                                     child_exclude)
+            child.check()
+            fields.append((name, child))
+            nested.append((name, key, path, child))
+        self.fields = tuple(fields)
+        self.plan = tuple(plan)
+        self.nested = tuple(nested)
+        self._only = only
+        self._exclude = exclude
+        self._model_class = model_class
+        # Names that are not fields of the class, which must name fields
+        # added to the instance with Model.add_field.
+        self.unknown = frozenset(
+            name for name in set(only or ()) | set(exclude)
+            if name not in model_class._clsfields)
+
+    def check(self, extra=()):
+        '''Raises :exc:`ValueError` if a name matches neither a field of
+        the class nor one of the ``extra`` field names.
+
+        '''
+        for name in sorted(self.unknown):
+            if name not in extra:
+                raise ValueError("{0} has no field '{1}'".format(
+                    self._model_class.__name__, name))
+
+    def selects(self, name):
+        '''Returns whether a field added to an instance with
+        :meth:`Model.add_field` is selected.
+
+        '''
+        if self._only is not None and name not in self._only:
+            return False
+        return name not in self._exclude
 
 
 def get_declared_fields(bases, attrs):
@@ -10,20 +164,103 @@ def get_declared_fields(bases, attrs):
     Create a list of model field instances from the passed in 'attrs', plus any
     similar fields on the base classes (in 'bases').
     """
-    fields = list()
-    attrs_items = list(attrs.items())
-    for field_name, obj in attrs_items:
-        if isinstance(obj, BaseField):
-            if not obj.verbose_name:
-                obj.verbose_name = field_name
-            fields.append((field_name, attrs.pop(field_name)))
-    fields.sort(key=lambda x: x[1].creation_counter)
+    declared = [(field_name, obj) for field_name, obj in attrs.items()
+                if isinstance(obj, BaseField)]
+    declared.sort(key=lambda x: x[1].creation_counter)
+
+    # The fields of each base are already collected in its _clsfields, so
+    # they are merged as they are instead of walking the whole hierarchy.
+    fields = OrderedDict()
+    for base in bases:
+        base_fields = getattr(base, '_clsfields', None)
+        if base_fields:
+            fields.update(base_fields)
+
+    for field_name, obj in declared:
+        del attrs[field_name]
+        if not obj.verbose_name:
+            obj.verbose_name = field_name
+        fields[field_name] = obj
+    return fields
+
+
+def apply_intern_policy(fields, intern):
+    """Give the CharFields in ``fields`` that do not set ``intern`` the
+    model's policy. Fields are copied first, as they may be shared with a
+    base class.
+
+    """
+    for name, field in fields.items():
+        if isinstance(field, CharField) and field.intern is None:
+            field = copy(field)
+            field.set_intern(intern)
+            fields[name] = field
+
+
+class ModelOptions(object):
+    """Options declared on the inner ``Meta`` class of a :class:`Model`.
+
+    Any option not declared on ``Meta`` is inherited from the first base
+    class that has options, falling back to the defaults below.
+
+    """
+    defaults = {
+        # Byte order prefix for the struct layouts built by
+        # :mod:`micromodels.records`.
+        'struct_byte_order': '<',
+        # Mapping of field name to struct format code, overriding the
+        # default code for that field type.
+        'struct_formats': {},
+        # Maximum number of decoded instances kept by the per-class
+        # decode cache of :mod:`micromodels.cache`, or 0 to disable it.
+        'decode_cache': 0,
+        # Whether instances reject assignment once decoded. See
+        # :class:`FrozenModel`.
+        'frozen': False,
+        # Default ``intern`` argument for the CharFields of the model that
+        # do not set one.
+        'intern_strings': None,
+        # Called with the text of each JSON number that has a fraction or
+        # exponent when decoding JSON, like the parse_float argument of
+        # json.loads. decimal.Decimal lets DecimalFields read the exact
+        # number instead of a float. It applies to every number in the
+        # document, so other fields may hold Decimals too; to_json writes
+        # them as exact strings.
+        'parse_float': None,
+    }
 
-    for base in bases[::-1]:
-        if hasattr(base, '_clsfields'):
-            fields = list(base._clsfields.items()) + fields
+    def __init__(self, meta=None, base_options=None):
+        for name, default in self.defaults.items():
+            if base_options is not None:
+                default = getattr(base_options, name)
+            setattr(self, name, getattr(meta, name, default))
 
-    return OrderedDict(fields)
+
+class FrozenInstanceError(AttributeError):
+    """Raised when assigning to an instance of a frozen model."""
+    pass
+
+
+def frozen_hash(self):
+    return self.__dict__['_hash']
+
+
+class HiddenDescriptor(object):
+    """Hides an inherited descriptor, so that attribute lookups fall back to
+    the instance dictionary and then to :meth:`Model.__getattr__`, as for
+    fields without a descriptor.
+
+    """
+
+    def __get__(self, instance, owner):
+        raise AttributeError
+
+
+def get_base_options(bases):
+    for base in bases:
+        if hasattr(base, '_meta'):
+            return base._meta
+    return None
 
 
 class ModelMeta(type):
@@ -31,7 +268,27 @@ class ModelMeta(type):
         is to move all of fields into the _fields variable on the class.
     '''
     def __new__(cls, name, bases, attrs):
+        attrs['_meta'] = ModelOptions(attrs.pop('Meta', None),
+                                      get_base_options(bases))
         attrs['_clsfields'] = get_declared_fields(bases, attrs)
+        if attrs['_meta'].intern_strings is not None:
+            apply_intern_policy(attrs['_clsfields'],
+                                attrs['_meta'].intern_strings)
+        if attrs['_meta'].frozen:
+            attrs.setdefault('__hash__', frozen_hash)
+        inherited = set()
+        for base in bases:
+            inherited.update(getattr(base, '_descriptors', ()))
+        descriptors = set()
+        for field_name, field in attrs['_clsfields'].items():
+            descriptor = field.descriptor(field_name)
+            if descriptor is not None:
+                attrs[field_name] = descriptor
+                descriptors.add(field_name)
+            elif field_name in inherited:
+                # The field overrides one with a descriptor in a base class.
+                attrs[field_name] = HiddenDescriptor()
+        attrs['_descriptors'] = frozenset(descriptors)
         new_class = super(ModelMeta, cls).__new__(cls, name, bases, attrs)
         return new_class
 
@@ -81,26 +338,216 @@ class Model(object):
     # __metaclass__ = ModelMeta
 
     def __init__(self, **values):
-        super(Model, self).__setattr__('_extra', OrderedDict())
+        self._setup()
         super(Model, self).__init__()
+        if values or self._meta.frozen:
+            self.set_data(values)
+            self._finish_decode()
+
+    def _setup(self):
+        super(Model, self).__setattr__('_extra', OrderedDict())
+        super(Model, self).__setattr__('_changed', set())
+        # BaseField.__copy__ is called directly, as copy() would spend more
+        # time dispatching than copying.
         self._clsfields = OrderedDict(
-            [(key, copy(field)) for key, field in self._clsfields.items()]
+            [(key, field.__copy__())
+             for key, field in self._clsfields.items()]
         )
-        if values:
-            self.set_data(values)
+
+    def _finish_decode(self):
+        self.reset_changes()
+        if self._meta.frozen:
+            attrs = self.__dict__
+            attrs['_hash'] = hash(self.content_hash())
+            attrs['_frozen'] = True
+
+    @classmethod
+    def build_class(cls, name, fields, meta=None):
+        '''Creates a subclass of this model programmatically. ``fields``
+        maps field names to field instances, which are ordered as they were
+        created, like in a class statement. ``meta`` is an optional
+        dictionary of ``Meta`` options.
+
+        For example, ``Model.build_class('Person', {'name': CharField()})``
+        is equivalent to::
+
+            class Person(Model):
+                name = CharField()
+
+        '''
+        attrs = dict(fields)
+        attrs['__module__'] = cls.__module__
+        if meta:
+            attrs['Meta'] = type('Meta', (object,), dict(meta))
+        return type(cls)(str(name), (cls,), attrs)
 
     @classmethod
-    def from_dict(cls, D, is_json=False):
+    def from_dict(cls, D, is_json=False, only=None, exclude=None):
         '''This factory for :class:`Model`
         takes either a native Python dictionary or a JSON dictionary/object
         if ``is_json`` is ``True``. The dictionary passed does not need to
         contain all of the values that the Model declares.
 
+        If the class enables the decode cache (see :mod:`micromodels.cache`),
+        payloads seen before are not decoded again; a copy of the instance
+        decoded the first time is returned instead.
+
+        ``only`` and ``exclude`` restrict decoding to some of the fields.
+        They are iterables of field names, where a dotted name such as
+        ``'author.name'`` selects a field of the models held by a
+        :class:`~micromodels.ModelField` or
+        :class:`~micromodels.ModelCollectionField`. Fields that are not
+        selected are not converted, and hold their default if accessed.
+        Names that match no field raise :exc:`ValueError`. Projected decodes
+        do not use the decode cache, and each class keeps up to
+        :data:`MAX_PROJECTIONS` compiled sets of names.
+
         '''
-        instance = cls()
+        if only is not None or exclude is not None:
+            projection = cls._projection(only, exclude)
+            projection.check()
+            if is_json:
+                D = cls._loads(D)
+            return cls._decode_projected(D, projection)
+        cache = cls.decode_cache()
+        if cache is None:
+            return cls._decode(D, is_json)
+        key = cache.key(D, is_json)
+        if key is None:
+            return cls._decode(D, is_json)
+        instance = cache.get(key)
+        if instance is None:
+            instance = cls._decode(D, is_json)
+            cache.put(key, instance)
+        if cls._meta.frozen:
+            return instance
+        return instance._clone()
+
+    @classmethod
+    def _blank(cls):
+        # Returns an instance without data for the decoders to populate.
+        # __init__ runs, as subclasses may override it, except on frozen
+        # models, whose __init__ would freeze the instance before it has
+        # been populated.
+        if cls._meta.frozen:
+            instance = cls.__new__(cls)
+            instance._setup()
+            return instance
+        return cls()
+
+    @classmethod
+    def _decode(cls, D, is_json):
+        instance = cls._blank()
         instance.set_data(D, is_json=is_json)
+        instance._finish_decode()
+        return instance
+
+    @classmethod
+    def _projection(cls, only=None, exclude=None):
+        # Returns the Projection for a set of only and exclude names,
+        # compiling it on first use.
+        key = (None if only is None else frozenset(only),
+               None if exclude is None else frozenset(exclude))
+        projections = cls.__dict__.get('_projections')
+        if projections is None:
+            projections = cls._projections = OrderedDict()
+        projection = projections.get(key)
+        if projection is None:
+            projection = Projection(cls, key[0], key[1])
+            # Names may come from requests, so the number of projections
+            # kept is bounded.
+            while len(projections) >= MAX_PROJECTIONS:
+                projections.popitem(last=False)
+            projections[key] = projection
+        return projection
+
+    @classmethod
+    def _decode_projected(cls, D, projection):
+        instance = cls._blank()
+        fields = instance._clsfields
+        core.set_data(instance, D, projection.plan, fields)
+        for name, key, path, child in projection.nested:
+            if path is None:
+                value = D[key] if key in D else core.MISSING
+            else:
+                value = core.get_path(D, path)
+            wrapped_class = fields[name]._wrapped_class
+            if value is core.MISSING:
+                value = fields[name].get_default()
+            elif isinstance(value, dict):
+                value = wrapped_class._decode_projected(value, child)
+            elif isinstance(value, list):
+                value = [wrapped_class._decode_projected(item, child)
+                         if isinstance(item, dict) else item
+                         for item in value]
+            setattr(instance, name, value)
+        instance._finish_decode()
         return instance
 
+    @classmethod
+    def decode_cache(cls):
+        '''Returns the :class:`~micromodels.cache.DecodeCache` of the class,
+        or ``None`` if its ``Meta`` does not enable one.
+
+        '''
+        cache = cls.__dict__.get('_decode_cache')
+        if cache is None and cls._meta.decode_cache:
+            from micromodels.cache import DecodeCache
+            cache = DecodeCache(cls._meta.decode_cache)
+            cls._decode_cache = cache
+        return cache
+
+    @classmethod
+    def pool(cls, size=1000):
+        '''Returns a :class:`~micromodels.pool.ModelPool` context manager,
+        whose ``from_dict`` method decodes instances that are reset and
+        reused once the ``with`` block exits. Up to ``size`` instances are
+        kept for reuse in each thread.
+
+        '''
+        from micromodels.pool import ModelPool
+        return ModelPool(cls, size)
+
+    def _clone(self):
+        # Returns an independent copy of the instance, sharing only the
+        # immutable field values.
+        clone = type(self).__new__(type(self))
+        attrs = clone.__dict__
+        attrs.update(self.__dict__)
+        attrs['_changed'] = set()
+        if '_backrefs' in attrs:
+            attrs['_backrefs'] = dict(attrs['_backrefs'])
+        attrs['_clsfields'] = OrderedDict(
+            (key, copy(field)) for key, field in self._clsfields.items())
+        attrs['_extra'] = OrderedDict(
+            (key, copy(field)) for key, field in self._extra.items())
+        for key, field in clone._fields.items():
+            if field._related_name is not None:
+                field._related_obj = clone
+            value = attrs.get(key)
+            if value is None:
+                continue
+            if isinstance(field, ModelField):
+                value = value._clone()
+            elif isinstance(value, LazyModelList):
+                attrs[key] = value.copy(clone)
+                continue
+            elif isinstance(field, ModelCollectionField):
+                if iter(value) is value:
+                    # A one-shot iterator cannot be copied; it is shared.
+                    continue
+                value = [item._clone() for item in value]
+            elif isinstance(value, (list, dict, set)):
+                value = deepcopy(value)
+            else:
+                continue
+            attrs[key] = value
+            if field._related_name is not None:
+                children = value if isinstance(value, list) else [value]
+                for child in children:
+                    child._set_backref(field._related_name, clone)
+        return clone
+
     @classmethod
     def from_kwargs(cls, **kwargs):
         '''This factory for :class:`Model` only takes keywork arguments.
@@ -108,29 +555,211 @@ class Model(object):
         set on the new :class:`Model` instance.
 
         '''
-        instance = cls()
-        instance.set_data(kwargs)
-        return instance
+        return cls._decode(kwargs, False)
+
+    @classmethod
+    def stream_json(cls, fileobj, name, chunk_size=65536):
+        '''Decodes an instance from the JSON object in ``fileobj`` without
+        reading the array of the collection field ``name`` into memory; the
+        field holds an iterator that decodes its items one at a time instead.
+        See :mod:`micromodels.streaming`.
+
+        '''
+        from micromodels import streaming
+        return streaming.stream_json(cls, fileobj, name, chunk_size=chunk_size)
+
+    @classmethod
+    def aiter_jsonl(cls, reader, yield_every=100, executor=None):
+        '''Returns an asynchronous iterator of instances decoded from the
+        newline-delimited JSON read from an :class:`asyncio.StreamReader`::
+
+            async for instance in MyModel.aiter_jsonl(reader):
+                ...
+
+        See :mod:`micromodels.aio` for the meaning of the keyword arguments.
+
+        '''
+        from micromodels import aio
+        return aio.aiter_jsonl(cls, reader, yield_every=yield_every,
+                               executor=executor)
+
+    @classmethod
+    def awrite_jsonl(cls, writer, instances, yield_every=100, executor=None):
+        '''Coroutine writing ``instances`` as newline-delimited JSON to an
+        :class:`asyncio.StreamWriter`. The counterpart of :meth:`aiter_jsonl`.
+
+        '''
+        from micromodels import aio
+        return aio.awrite_jsonl(writer, instances, yield_every=yield_every,
+                                executor=executor)
+
+    @classmethod
+    def _loads(cls, text):
+        parse_float = cls._meta.parse_float
+        if parse_float is None:
+            return _module('json').loads(text)
+        return _module('json').loads(text, parse_float=parse_float)
 
     def set_data(self, data, is_json=False):
         if is_json:
-            data = json.loads(data)
-        for name, field in self._clsfields.items():
-            key = field.source or name
-            if key in data:
-                setattr(self, name, data[key])
+            data = self._loads(data)
+        core.set_data(self, data, self._decode_plan(), self._clsfields)
+
+    @classmethod
+    def _decode_plan(cls):
+        # The (name, source key, source path) tuples used by set_data,
+        # computed once per class. Fields with a nested source have their
+        # path compiled to a tuple, and the first key of the path as their
+        # source key; the path of other fields is None.
+        plan = cls.__dict__.get('_plan')
+        if plan is None:
+            entries = []
+            for name, field in cls._clsfields.items():
+                path = source_path(field.source)
+                if path is None:
+                    entries.append((name, field.source or name, None))
+                else:
+                    entries.append((name, path[0], path))
+            plan = tuple(entries)
+            cls._plan = plan
+        return plan
+
+    @classmethod
+    def _names_by_source(cls):
+        # Maps each source key to the name of the field it populates. Fields
+        # with a nested source are not included.
+        names = cls.__dict__.get('_source_names')
+        if names is None:
+            names = dict((key, name) for name, key, path in cls._decode_plan()
+                         if path is None)
+            cls._source_names = names
+        return names
+
+    def update(self, partial, is_json=False):
+        '''Applies ``partial`` to the instance as a JSON Merge Patch
+        (:rfc:`7396`). Unlike :meth:`set_data`, only the fields whose source
+        keys are present in ``partial`` are converted and assigned; the others
+        keep their current values.
+
+        A ``None`` value resets the field as if it had been missing from the
+        source data, as does a ``None`` or other non-object value replacing
+        an object along the nested ``source`` path of a field. A dictionary
+        value for a
+        :class:`~micromodels.ModelField` that already holds an instance is
+        merged into that instance recursively.
+
+        '''
+        if is_json:
+            partial = self._loads(partial)
+        for name, key, path in self._decode_plan():
+            if path is not None and key in partial:
+                value = patched_value(partial, path)
+                if value is not core.MISSING:
+                    setattr(self, name, value)
+        names = self._names_by_source()
+        for key, value in partial.items():
+            name = names.get(key)
+            if name is not None:
+                field = self._clsfields[name]
+            elif key in self._extra:
+                name, field = key, self._extra[key]
             else:
-                setattr(self, name, field.get_default())
+                continue
+            current = self.__dict__.get(name)
+            if (isinstance(field, ModelField) and isinstance(value, dict)
+                    and isinstance(current, Model)):
+                current.update(value)
+            else:
+                setattr(self, name, value)
+
+    def _check_not_frozen(self, action, key):
+        if '_frozen' in self.__dict__:
+            raise FrozenInstanceError(
+                "cannot {0} '{1}' of frozen {2} instance"
+                .format(action, key, type(self).__name__))
 
     def __setattr__(self, key, value):
-        if key in self._fields:
-            field = self._fields[key]
-            field.populate(value)
-            field._related_obj = self
-            super(Model, self).__setattr__(key, field.to_python())
+        self._check_not_frozen('assign to', key)
+        # Look the field up directly rather than through _fields, which
+        # builds a new dictionary on every access.
+        field = self._clsfields.get(key) or self._extra.get(key)
+        if field is not None:
+            self._set_field(key, field, value)
+            self._changed.add(key)
+            self.__dict__.pop('_digest', None)
         else:
             super(Model, self).__setattr__(key, value)
 
+    def __delattr__(self, key):
+        self._check_not_frozen('delete', key)
+        super(Model, self).__delattr__(key)
+
+    def replace(self, **changes):
+        '''Returns a copy of the instance with the fields named in ``changes``
+        set to new values. Only the changed fields are converted. For frozen
+        models, the values and fields of the other fields are shared with the
+        original instance; instances of other models are copied first, so
+        that the copy can be changed independently.
+
+        '''
+        if not self._meta.frozen:
+            clone = self._clone()
+            clone.__dict__.pop('_digest', None)
+        else:
+            clone = type(self).__new__(type(self))
+            attrs = clone.__dict__
+            attrs.update(self.__dict__)
+            for key in ('_frozen', '_hash', '_digest'):
+                attrs.pop(key, None)
+            attrs['_changed'] = set()
+            attrs['_clsfields'] = OrderedDict(self._clsfields)
+        for key, value in changes.items():
+            if key not in clone._clsfields:
+                raise TypeError("{0} has no field '{1}'".format(
+                    type(self).__name__, key))
+            field = copy(clone._clsfields[key])
+            clone._clsfields[key] = field
+            clone._set_field(key, field, value)
+        clone._finish_decode()
+        return clone
+
+    def _set_field(self, key, field, value):
+        field.populate(value)
+        if field._related_name is not None:
+            field._related_obj = self
+        super(Model, self).__setattr__(key, field.to_python())
+
+    def _set_backref(self, name, obj):
+        # The model holding this one (through a field with a related_name)
+        # is referenced weakly, so that model graphs have no reference
+        # cycles and are freed as soon as they are no longer used.
+        # __getattr__ dereferences it.
+        attrs = self.__dict__
+        attrs.pop(name, None)
+        backrefs = attrs.get('_backrefs')
+        if backrefs is None:
+            backrefs = attrs['_backrefs'] = {}
+        backrefs[name] = None if obj is None else weakref.ref(obj)
+
+    def __getstate__(self):
+        # The weakly referenced back-references are saved as the objects
+        # themselves, as weak references cannot be pickled.
+        state = dict(self.__dict__)
+        backrefs = state.get('_backrefs')
+        if backrefs is not None:
+            state['_backrefs'] = dict(
+                (name, None if ref is None else ref())
+                for name, ref in backrefs.items())
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        backrefs = state.pop('_backrefs', None)
+        self.__dict__.update(state)
+        if backrefs is not None:
+            for name, obj in backrefs.items():
+                self._set_backref(name, obj)
+
     def __getattr__(self, key):
         # Lazily set the default when trying to access an attribute
         # that has not otherwise been set.
@@ -139,8 +768,13 @@ class Model(object):
         field = fields.get(key) or extra.get(key)
         if field:
             value = field.to_python()
-            setattr(self, key, value)
+            # Filling in a default is not a change to the instance.
+            self._set_field(key, field, value)
             return value
+        backrefs = object.__getattribute__(self, '__dict__').get('_backrefs')
+        if backrefs is not None and key in backrefs:
+            ref = backrefs[key]
+            return None if ref is None else ref()
         return object.__getattribute__(self, key)
 
     @property
@@ -154,29 +788,223 @@ class Model(object):
         reassigned without using this method.
 
         '''
+        self._check_not_frozen('add field', key)
         self._extra[key] = field
         setattr(self, key, value)
 
-    def to_dict(self, serial=False):
+    def _nested_values(self, decoded_only=False):
+        # Yields (name, [instances]) for each field holding nested models.
+        # With decoded_only, the items of lazy collections that have not been
+        # converted yet (and so cannot have changed) are skipped. One-shot
+        # iterators, such as the collection of an instance decoded by
+        # Model.stream_json, are skipped so that they are not consumed.
+        for name, field in self._fields.items():
+            value = self.__dict__.get(name)
+            if value is None:
+                continue
+            if isinstance(field, ModelField):
+                yield name, [value]
+            elif decoded_only and isinstance(value, LazyModelList):
+                yield name, value.decoded()
+            elif (isinstance(field, ModelCollectionField) and
+                    iter(value) is not value):
+                yield name, value
+
+    def _has_changes(self):
+        if self._changed:
+            return True
+        for name, children in self._nested_values(decoded_only=True):
+            if any(child._has_changes() for child in children):
+                return True
+        return False
+
+    def changed_fields(self):
+        '''Returns the set of field names that were assigned since the
+        instance was decoded, or since the last call to :meth:`reset_changes`.
+        A field holding nested models is also included when any of them has
+        changed.
+
+        '''
+        changed = set(self._changed)
+        for name, children in self._nested_values(decoded_only=True):
+            if any(child._has_changes() for child in children):
+                changed.add(name)
+        return changed
+
+    def reset_changes(self):
+        '''Marks the instance and all of its nested models as unchanged.'''
+        self._changed.clear()
+        for name, children in self._nested_values(decoded_only=True):
+            for child in children:
+                child.reset_changes()
+
+    def _changes_dict(self, serial):
+        fields = self._fields
+        result = {}
+        for key in self.changed_fields():
+            field = fields[key]
+            value = getattr(self, key)
+            if key not in self._changed and isinstance(field, ModelField):
+                # Only the nested model's own fields changed.
+                result[key] = value.to_dict(serial=serial, only_changed=True)
+            elif serial:
+                result[key] = field.to_serial(value)
+            else:
+                result[key] = value
+        return result
+
+    def to_dict(self, serial=False, only_changed=False, only=None,
+                exclude=None):
         '''A dictionary representing the the data of the class is returned.
         Native Python objects will still exist in this dictionary (for example,
         a ``datetime`` object will be returned rather than a string)
         unless ``serial`` is set to True.
 
+        If ``only_changed`` is True, only the fields returned by
+        :meth:`changed_fields` are included. Nested models that were changed
+        but not replaced only include their own changed fields, while
+        collections of models are always included in full.
+
+        ``only`` and ``exclude`` select the fields to include, as for
+        :meth:`from_dict`. They cannot be combined with ``only_changed``.
+
         '''
+        if only is not None or exclude is not None:
+            if only_changed:
+                raise ValueError('only_changed cannot be combined with only '
+                                 'or exclude')
+            projection = type(self)._projection(only, exclude)
+            projection.check(self._extra)
+            return self._projected_dict(projection, serial)
+        if only_changed:
+            return self._changes_dict(serial)
+        fields = self._fields
         if serial:
-            return dict((key, self._fields[key].to_serial(getattr(self, key)))
-                        for key in self._fields.keys() if hasattr(self, key))
+            return dict((key, fields[key].to_serial(getattr(self, key)))
+                        for key in fields.keys() if hasattr(self, key))
         else:
-            return dict((key, getattr(self, key)) for key in self._fields.keys()
+            return dict((key, getattr(self, key)) for key in fields.keys()
                         if hasattr(self, key))
 
+    def _projected_dict(self, projection, serial):
+        fields = self._clsfields
+        result = {}
+        for name, child in projection.fields:
+            value = getattr(self, name)
+            if child is None or value is None:
+                result[name] = (fields[name].to_serial(value) if serial
+                                else value)
+            elif isinstance(value, Model):
+                result[name] = value._projected_dict(child, serial)
+            else:
+                result[name] = [item._projected_dict(child, serial)
+                                for item in value]
+        for name, field in self._extra.items():
+            if projection.selects(name):
+                value = getattr(self, name)
+                result[name] = field.to_serial(value) if serial else value
+        return result
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        fields = self._fields
+        if list(fields.keys()) != list(other._fields.keys()):
+            return False
+        for key in fields:
+            if getattr(self, key) != getattr(other, key):
+                return False
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    # Instances are mutable, so they compare by value but are not hashable;
+    # use content_hash() as a key instead. Frozen models are hashable.
+    __hash__ = None
+
+    def _own_digest(self):
+        # Digest of the fields not holding nested models, cached until one
+        # of the fields is assigned.
+        digest = self.__dict__.get('_digest')
+        if digest is None:
+            import hashlib
+            hasher = hashlib.sha1(type(self).__name__.encode('utf-8'))
+            for key, field in self._fields.items():
+                value = getattr(self, key)
+                if (value is not None and
+                        isinstance(field, (ModelField, ModelCollectionField))):
+                    continue
+                hasher.update(_module('json').dumps(
+                    [key, field.to_serial(value)], sort_keys=True,
+                    separators=(',', ':'), default=str
+                ).encode('utf-8'))
+            digest = hasher.digest()
+            super(Model, self).__setattr__('_digest', digest)
+        return digest
+
+    def content_hash(self):
+        '''Returns a hex digest of the serialized field values of the
+        instance, which is stable across processes and can be used as a
+        dictionary key or to find duplicates.
+
+        The digest of the instance's own fields is cached until one of its
+        fields is assigned, and nested models contribute their own cached
+        digests. Values changed in place, such as a list held by a
+        :class:`~micromodels.FieldCollectionField`, are not detected.
+
+        '''
+        import hashlib
+        hasher = hashlib.sha1(self._own_digest())
+        for name, children in self._nested_values():
+            hasher.update(name.encode('utf-8'))
+            for child in children:
+                hasher.update(child.content_hash().encode('ascii'))
+        return hasher.hexdigest()
+
+    @classmethod
+    def json_schema(cls):
+        '''Returns a JSON Schema document describing the source data the
+        class accepts. The document is built once per class and shared, so it
+        must not be modified. See :func:`micromodels.schema.to_json_schema`.
+
+        '''
+        schema = cls.__dict__.get('_json_schema')
+        if schema is None:
+            from micromodels.schema import to_json_schema
+            schema = to_json_schema(cls)
+            cls._json_schema = schema
+        return schema
+
     def to_json(self):
         '''Returns a representation of the model as a JSON string. This method
         relies on the :meth:`~micromodels.Model.to_dict` method.
 
         '''
-        return json.dumps(self.to_dict(serial=True))
+        return _module('json').dumps(self.to_dict(serial=True),
+                                     default=json_default)
+
+    @classmethod
+    def from_msgpack(cls, data):
+        '''This factory for :class:`Model` takes the bytes produced by
+        :meth:`to_msgpack`. See :mod:`micromodels.binary`.
+
+        '''
+        from micromodels import binary
+        return cls.from_dict(binary.loads(data))
+
+    def to_msgpack(self):
+        '''Returns a compact binary representation of the model in the
+        MessagePack format. Unlike :meth:`to_json`, date, time, UUID and decimal
+        values are kept in binary form, so :meth:`from_msgpack` does not need
+        to parse them from strings.
+
+        '''
+        from micromodels import binary
+        return binary.dumps(binary.native_dict(self))
 
     def validate(self):
         '''Run basic validation on the model. Returns an error dict if
@@ -208,3 +1036,122 @@ class Model(object):
                 error_dict.setdefault(name, [])
                 error_dict[name].append(str(err))
         return error_dict or None
+
+    @classmethod
+    def validate_many(cls, records, max_errors=1000):
+        '''Decodes and validates a batch of records, which may be
+        dictionaries or instances of the class, and returns a list of
+        :data:`FieldError` tuples. The list is empty if every record is valid.
+
+        Unlike :meth:`validate`, conversion errors are reported instead of
+        raised, and nested :class:`~micromodels.ModelField` and
+        :class:`~micromodels.ModelCollectionField` models are validated too.
+        Each error has the JSON pointer of the offending value, such as
+        ``/3/lines/0/price``. Collection stops after ``max_errors`` errors, or
+        never if it is ``None``.
+
+        '''
+        collector = ErrorCollector(max_errors)
+        for index, record in enumerate(records):
+            if collector.full:
+                break
+            path = pointer('', index)
+            if isinstance(record, cls):
+                record._collect_errors(path, collector)
+            elif isinstance(record, dict):
+                cls._decode_collecting(record, path, collector)
+            else:
+                collector.add(path, 'Expected an object.')
+        return collector.errors
+
+    @classmethod
+    def _decode_collecting(cls, data, path, collector):
+        # Decodes data one field at a time, reporting conversion errors to
+        # the collector, then validates the fields that were converted.
+        instance = cls._blank()
+        fields = instance._clsfields
+        failed = set()
+        for name, key, source in cls._decode_plan():
+            field = fields[name]
+            if source is None:
+                value = data[key] if key in data else core.MISSING
+            else:
+                value = core.get_path(data, source)
+                key = source
+            if value is core.MISSING:
+                value = field.get_default()
+            try:
+                if (isinstance(field, ModelField) and
+                        isinstance(value, dict)):
+                    value = field._wrapped_class._decode_collecting(
+                        value, pointer(path, key), collector)
+                elif (isinstance(field, ModelCollectionField) and
+                        isinstance(value, list)):
+                    value = [
+                        field._wrapped_class._decode_collecting(
+                            item, pointer(pointer(path, key), index),
+                            collector)
+                        if isinstance(item, dict) else item
+                        for index, item in enumerate(value)
+                    ]
+                setattr(instance, name, value)
+            except Exception as err:
+                failed.add(name)
+                collector.add(pointer(path, key), str(err))
+        instance._finish_decode()
+        instance._collect_errors(path, collector, failed, nested=False)
+        return instance
+
+    def _collect_errors(self, path, collector, skip=(), nested=True):
+        for name, field in self._fields.items():
+            if collector.full:
+                return
+            if name in skip:
+                continue
+            key = source_path(field.source) or field.source or name
+            value = getattr(self, name)
+            try:
+                for validator in field.validators:
+                    rvalue = validator(value)
+                    value = value if rvalue is None else rvalue
+            except ValidationError as err:
+                collector.add(pointer(path, key), str(err))
+            validator = getattr(self, 'validate_{0}'.format(name), None)
+            if validator is not None:
+                try:
+                    validator()
+                except ValidationError as err:
+                    collector.add(pointer(path, key), str(err))
+            # Models decoded by _decode_collecting have been checked already.
+            if not nested or value is None:
+                continue
+            if isinstance(field, ModelField):
+                value._collect_errors(pointer(path, key), collector)
+            elif isinstance(field, ModelCollectionField):
+                for index, item in enumerate(value):
+                    item._collect_errors(
+                        pointer(pointer(path, key), index), collector)
+
+
+class FrozenModel(Model):
+    """A :class:`Model` whose instances cannot be changed once they have been
+    decoded. Setting ``frozen = True`` on the ``Meta`` class of any model has
+    the same effect.
+
+    Every field is converted when the instance is created, and its hash is
+    computed from :meth:`~Model.content_hash` up front, so instances can be
+    used as dictionary keys and shared between threads and caches without
+    copying. Use :meth:`~Model.replace` to derive a modified instance.
+
+    Nested models should be frozen too for the whole instance to be
+    immutable. Frozen models cannot be the target of a ``related_name``, as
+    that requires assigning to the nested instance.
+
+    The decoding class methods such as :meth:`~Model.from_dict` do not call
+    the ``__init__`` method of frozen models, which would freeze the
+    instance before its fields are set.
+
+    """
+
+    class Meta:
+        frozen = True
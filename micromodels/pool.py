@@ -0,0 +1,116 @@
+"""Reuse of short-lived model instances within a scope.
+
+Code that decodes many instances and discards them all soon after, such as
+a request handler, can decode them through a pool instead::
+
+    >>> with Event.pool(size=1000) as pool:
+    ...     events = [pool.from_dict(item) for item in payload['events']]
+    ...     handle(events)
+
+When the ``with`` block exits, the instances decoded by the pool are reset
+and kept for reuse, along with their per-instance field objects, so the
+next scope reuses them instead of allocating new ones. The instances must
+not be used once the block has exited.
+
+Each class keeps up to ``size`` spare instances per thread. Only the
+top-level instances are reused; nested models are decoded as usual.
+
+New instances are created through the class, so a subclass's ``__init__``
+runs for them. Reused instances are not initialized again: resetting an
+instance clears every attribute, including those set by ``__init__``.
+
+"""
+import threading
+
+
+def reset(instance):
+    '''Clears the values of an instance, keeping its field objects and the
+    containers used for its bookkeeping.
+
+    '''
+    attrs = instance.__dict__
+    fields = attrs['_clsfields']
+    extra = attrs['_extra']
+    changed = attrs['_changed']
+    attrs.clear()
+    extra.clear()
+    changed.clear()
+    attrs['_clsfields'] = fields
+    attrs['_extra'] = extra
+    attrs['_changed'] = changed
+    for field in fields.values():
+        state = field.__dict__
+        state.pop('data', None)
+        if '_related_ref' in state:
+            state['_related_ref'] = None
+
+
+def spare_instances(model_class):
+    '''Returns the current thread's list of spare instances of
+    ``model_class``.
+
+    '''
+    local = model_class.__dict__.get('_pool_local')
+    if local is None:
+        local = threading.local()
+        model_class._pool_local = local
+    spares = getattr(local, 'spares', None)
+    if spares is None:
+        spares = local.spares = []
+    return spares
+
+
+class ModelPool(object):
+    """A context manager that decodes instances of a model class, reusing
+    the instances released by earlier scopes in the same thread.
+
+    Use :meth:`Model.pool() <micromodels.Model.pool>` rather than
+    instantiating this class directly.
+
+    """
+
+    def __init__(self, model_class, size=1000):
+        if model_class._meta.frozen:
+            raise TypeError('Instances of frozen models cannot be pooled')
+        self.model_class = model_class
+        self.size = size
+        self._spares = None
+        self._used = []
+
+    def __enter__(self):
+        self._spares = spare_instances(self.model_class)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def from_dict(self, D, is_json=False):
+        '''Decodes an instance like :meth:`Model.from_dict()
+        <micromodels.Model.from_dict>`, without consulting the decode cache.
+
+        '''
+        if self._spares is None:
+            raise RuntimeError('ModelPool.from_dict must be called inside '
+                               'a with block')
+        if self._spares:
+            instance = self._spares.pop()
+        else:
+            instance = self.model_class._blank()
+        instance.set_data(D, is_json=is_json)
+        instance._finish_decode()
+        self._used.append(instance)
+        return instance
+
+    def release(self):
+        '''Resets the instances decoded in this scope and keeps up to
+        :attr:`size` of them for reuse.
+
+        '''
+        spares = self._spares
+        for instance in self._used:
+            if len(spares) >= self.size:
+                break
+            reset(instance)
+            spares.append(instance)
+        del self._used[:]
+        self._spares = None
@@ -0,0 +1,177 @@
+"""Fixed-width binary records for flat numeric models.
+
+A model made only of :class:`~micromodels.IntegerField`,
+:class:`~micromodels.FloatField` and :class:`~micromodels.BooleanField`
+can be packed into a fixed-width record with :mod:`struct`. The layout is
+derived from the field declarations, in declaration order, and compiled
+once per class::
+
+    >>> import micromodels
+    >>> from micromodels.records import layout_for
+    >>> class Reading(micromodels.Model):
+    ...     sensor = micromodels.IntegerField()
+    ...     value = micromodels.FloatField()
+    ...     ok = micromodels.BooleanField()
+    ...
+    ...     class Meta:
+    ...         struct_formats = {'sensor': 'H', 'value': 'f'}
+    ...
+    >>> layout = layout_for(Reading)
+    >>> layout.size
+    7
+    >>> data = layout.pack(Reading.from_kwargs(sensor=3, value=1.5, ok=True))
+    >>> layout.unpack(data).to_dict()
+    {'sensor': 3, 'value': 1.5, 'ok': True}
+
+The byte order defaults to little-endian and can be changed with the
+``struct_byte_order`` option of the model's ``Meta`` class.
+
+"""
+import struct
+
+from micromodels.fields import BooleanField, IntegerField, FloatField
+
+
+# Checked in order, so BooleanField must come before any field type it could
+# be mistaken for by a subclass.
+DEFAULT_FORMATS = (
+    (BooleanField, '?'),
+    (IntegerField, 'q'),
+    (FloatField, 'd'),
+)
+
+
+def default_format(field):
+    for field_class, code in DEFAULT_FORMATS:
+        if isinstance(field, field_class):
+            return code
+    return None
+
+
+class RecordLayout(object):
+    """A precompiled :class:`struct.Struct` for a flat numeric model.
+
+    Use :func:`layout_for` rather than instantiating this class directly, so
+    that each model class compiles its layout only once.
+
+    """
+
+    def __init__(self, model_class):
+        options = model_class._meta
+        names = []
+        codes = []
+        for name, field in model_class._clsfields.items():
+            code = options.struct_formats.get(name) or default_format(field)
+            if code is None:
+                raise TypeError(
+                    "Field '{0}' of {1} has no fixed-width representation"
+                    .format(name, model_class.__name__)
+                )
+            names.append(name)
+            codes.append(code)
+
+        self.model_class = model_class
+        self.names = tuple(names)
+        self.struct = struct.Struct(options.struct_byte_order + ''.join(codes))
+        self.size = self.struct.size
+
+    def _values(self, instance):
+        return [getattr(instance, name) for name in self.names]
+
+    def _build(self, values):
+        # The unpacked values are already native Python types, so they are
+        # stored directly instead of going through Model.__setattr__.
+        instance = self.model_class.__new__(self.model_class)
+        instance._setup()
+        fields = instance._clsfields
+        attrs = instance.__dict__
+        for name, value in zip(self.names, values):
+            fields[name].data = value
+            attrs[name] = value
+        instance._finish_decode()
+        return instance
+
+    def pack(self, instance):
+        '''Returns the record for ``instance`` as a bytes object.'''
+        try:
+            return self.struct.pack(*self._values(instance))
+        except struct.error as err:
+            raise ValueError('Cannot pack {0!r}: {1}'.format(instance, err))
+
+    def pack_into(self, buffer, offset, instance):
+        '''Writes the record for ``instance`` into a writable ``buffer``
+        starting at ``offset``.
+
+        '''
+        try:
+            self.struct.pack_into(buffer, offset, *self._values(instance))
+        except struct.error as err:
+            raise ValueError('Cannot pack {0!r}: {1}'.format(instance, err))
+
+    def pack_many(self, instances):
+        '''Packs a sequence of instances into one contiguous
+        :class:`bytearray`.
+
+        '''
+        instances = list(instances)
+        buffer = bytearray(self.size * len(instances))
+        offset = 0
+        for instance in instances:
+            self.pack_into(buffer, offset, instance)
+            offset += self.size
+        return buffer
+
+    def unpack(self, buffer, offset=0):
+        '''Builds an instance from the record at ``offset`` in ``buffer``.'''
+        return self._build(self.struct.unpack_from(buffer, offset))
+
+    def iter_unpack(self, buffer):
+        '''Yields an instance for each record in ``buffer``, whose length must
+        be a multiple of :attr:`size`.
+
+        '''
+        for values in self.struct.iter_unpack(buffer):
+            yield self._build(values)
+
+    def unpack_many(self, buffer):
+        '''Returns a list of instances for the records in ``buffer``.'''
+        return list(self.iter_unpack(buffer))
+
+    def read_records(self, fileobj, chunk_records=4096):
+        '''Yields instances for the records read from a binary file object.
+
+        Records are read ``chunk_records`` at a time into a single reusable
+        buffer, and decoded through a :class:`memoryview` of it, so no
+        intermediate bytes objects are created per record.
+
+        '''
+        buffer = bytearray(self.size * chunk_records)
+        view = memoryview(buffer)
+        pending = 0
+        while True:
+            read = fileobj.readinto(view[pending:])
+            if not read:
+                break
+            pending += read
+            complete = pending - pending % self.size
+            for offset in range(0, complete, self.size):
+                yield self._build(self.struct.unpack_from(view, offset))
+            # Move a trailing partial record to the start of the buffer.
+            view[:pending - complete] = view[complete:pending]
+            pending -= complete
+        if pending:
+            raise ValueError('Truncated record at end of file ({0} of {1} '
+                             'bytes)'.format(pending, self.size))
+
+
+def layout_for(model_class):
+    '''Returns the :class:`RecordLayout` of ``model_class``, compiling it on
+    first use. Raises ``TypeError`` if the model has fields that cannot be
+    represented as fixed-width values.
+
+    '''
+    layout = model_class.__dict__.get('_record_layout')
+    if layout is None:
+        layout = RecordLayout(model_class)
+        model_class._record_layout = layout
+    return layout
@@ -0,0 +1,368 @@
+"""Generation of model classes from JSON Schema documents.
+
+:func:`from_json_schema` turns an object schema into a
+:class:`~micromodels.Model` subclass::
+
+    >>> from micromodels.schema import from_json_schema
+    >>> Person = from_json_schema({
+    ...     'title': 'Person',
+    ...     'type': 'object',
+    ...     'properties': {
+    ...         'id': {'type': 'string', 'format': 'uuid'},
+    ...         'born': {'type': 'string', 'format': 'date'},
+    ...         'tags': {'type': 'array', 'items': {'type': 'string'}},
+    ...     },
+    ...     'required': ['id'],
+    ... })
+    >>> Person._clsfields['born']
+    <micromodels.fields.DateField object at ...>
+
+Nested object schemas become :class:`~micromodels.ModelField` and
+:class:`~micromodels.ModelCollectionField` fields of generated classes, and
+local ``$ref`` references to ``definitions`` or ``$defs`` are followed.
+Generated classes are cached by the content of the schema, and their
+decoding plans are computed up front, so loading the same schema again costs
+a single hash.
+
+In the other direction, :func:`to_json_schema` (also available as
+:meth:`Model.json_schema() <micromodels.Model.json_schema>`) describes the
+canonical input of a model class as a JSON Schema document, for example to
+let clients reject malformed payloads before sending them.
+
+"""
+import hashlib
+import json
+import keyword
+import re
+import threading
+
+from micromodels.fields import BaseField, BooleanField, CharField, \
+    ChoiceField, DateField, DateTimeField, DecimalField, \
+    FieldCollectionField, FloatField, IntegerField, JSONField, \
+    ModelCollectionField, ModelField, TimeField, UUIDField, source_path
+from micromodels.models import Model
+
+
+STRING_FORMATS = {
+    'date-time': DateTimeField,
+    'date': DateField,
+    'time': TimeField,
+    'uuid': UUIDField,
+}
+
+SCALAR_TYPES = {
+    'string': CharField,
+    'integer': IntegerField,
+    'number': FloatField,
+    'boolean': BooleanField,
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _schema_type(schema):
+    schema_type = schema.get('type')
+    if isinstance(schema_type, list):
+        types = [item for item in schema_type if item != 'null']
+        schema_type = types[0] if len(types) == 1 else None
+    if schema_type is None and 'properties' in schema:
+        schema_type = 'object'
+    return schema_type
+
+
+def _class_name(text):
+    words = re.split(r'[^0-9a-zA-Z]+', text)
+    name = ''.join(word[:1].upper() + word[1:] for word in words)
+    if not name or name[0].isdigit():
+        name = 'Model' + name
+    return name
+
+
+def _field_name(text):
+    name = re.sub(r'\W', '_', text)
+    if not name or name[0].isdigit() or keyword.iskeyword(name):
+        name = '_' + name
+    return name
+
+
+class _Builder(object):
+
+    def __init__(self, root, base):
+        self.root = root
+        self.base = base
+        self.classes = {}
+        self._resolving = set()
+
+    def resolve(self, schema):
+        ref = schema.get('$ref')
+        if ref is None:
+            return schema, None
+        if not ref.startswith('#/'):
+            raise ValueError('Only local references are supported: ' + ref)
+        target = self.root
+        for part in ref[2:].split('/'):
+            target = target[part.replace('~1', '/').replace('~0', '~')]
+        return target, ref
+
+    def model(self, schema, name):
+        schema, ref = self.resolve(schema)
+        if ref is not None:
+            if ref in self.classes:
+                return self.classes[ref]
+            if ref in self._resolving:
+                raise ValueError('Recursive references are not supported: ' +
+                                 ref)
+            self._resolving.add(ref)
+            name = ref.rsplit('/', 1)[-1]
+
+        fields = {}
+        required = set(schema.get('required', ()))
+        class_name = _class_name(schema.get('title') or name)
+        for key, prop in schema.get('properties', {}).items():
+            field_name = _field_name(key)
+            kwargs = {'required': key in required}
+            if '.' in key:
+                # A dotted source would be read as a nested path.
+                kwargs['source'] = (key,)
+            elif field_name != key:
+                kwargs['source'] = key
+            fields[field_name] = self.field(prop, class_name + '_' + key,
+                                            **kwargs)
+
+        model_class = self.base.build_class(class_name, fields)
+        # Compute the per-class decoding plans now rather than on the first
+        # decode.
+        model_class._decode_plan()
+        model_class._names_by_source()
+        if ref is not None:
+            self.classes[ref] = model_class
+        return model_class
+
+    def field(self, schema, name, **kwargs):
+        resolved, _ = self.resolve(schema)
+        if 'default' in resolved:
+            kwargs['default'] = resolved['default']
+        if 'description' in resolved:
+            kwargs['help_text'] = resolved['description']
+        options = [option for option in resolved.get('anyOf', ())
+                   if option.get('type') != 'null']
+        if len(options) == 1:
+            return self.field(options[0], name, **kwargs)
+        if 'enum' in resolved:
+            return ChoiceField(resolved['enum'], **kwargs)
+
+        schema_type = _schema_type(resolved)
+        if schema_type == 'object':
+            if 'properties' not in resolved:
+                return BaseField(**kwargs)
+            return ModelField(self.model(schema, name), **kwargs)
+        if schema_type == 'array':
+            items = resolved.get('items')
+            if not isinstance(items, dict):
+                return BaseField(**kwargs)
+            if _schema_type(self.resolve(items)[0]) == 'object':
+                return ModelCollectionField(self.model(items, name), **kwargs)
+            return FieldCollectionField(self.field(items, name), **kwargs)
+        if schema_type == 'string' and resolved.get('format') in \
+                STRING_FORMATS:
+            return STRING_FORMATS[resolved['format']](**kwargs)
+        if schema_type in SCALAR_TYPES:
+            return SCALAR_TYPES[schema_type](**kwargs)
+        return BaseField(**kwargs)
+
+
+def from_json_schema(schema, name='GeneratedModel', base=Model):
+    '''Returns a subclass of ``base`` for the object schema ``schema``.
+
+    The class is named after the schema's ``title``, or ``name`` if it has
+    none. Calling this function again with an equal schema returns the same
+    class.
+
+    '''
+    key = (hashlib.sha1(json.dumps(schema, sort_keys=True).encode('utf-8'))
+           .hexdigest(), name, base)
+    with _cache_lock:
+        model_class = _cache.get(key)
+        if model_class is None:
+            model_class = _Builder(schema, base).model(schema, name)
+            _cache[key] = model_class
+    return model_class
+
+
+def clear_cache():
+    '''Forgets the classes generated by :func:`from_json_schema`.'''
+    with _cache_lock:
+        _cache.clear()
+
+
+DRAFT = 'http://json-schema.org/draft-07/schema#'
+
+
+def _string_format(format_name):
+    def describe(field, exporter):
+        # Fields parsing a custom strptime format take any string.
+        if field.format is not None:
+            return {'type': 'string'}
+        return {'type': 'string', 'format': format_name}
+    return describe
+
+
+def _choice_schema(field, exporter):
+    values = []
+    for choice in field._choices.values():
+        value = field.to_serial(choice)
+        if value not in values:
+            values.append(value)
+    return {'enum': values}
+
+
+def _model_schema(field, exporter):
+    return exporter.reference(field._wrapped_class)
+
+
+def _collection_schema(field, exporter):
+    return {'type': 'array',
+            'items': exporter.reference(field._wrapped_class)}
+
+
+def _field_collection_schema(field, exporter):
+    return {'type': 'array', 'items': exporter.field(field._instance)}
+
+
+# Looked up along the MRO of each field's class, so subclasses of these
+# fields are described like their parent unless they are listed too.
+FIELD_SCHEMAS = {
+    BaseField: lambda field, exporter: {},
+    JSONField: lambda field, exporter: {},
+    CharField: lambda field, exporter: {'type': 'string'},
+    IntegerField: lambda field, exporter: {'type': 'integer'},
+    FloatField: lambda field, exporter: {'type': 'number'},
+    DecimalField: lambda field, exporter: {'type': ['number', 'string']},
+    BooleanField: lambda field, exporter: {'type': 'boolean'},
+    DateTimeField: _string_format('date-time'),
+    DateField: _string_format('date'),
+    TimeField: _string_format('time'),
+    UUIDField: lambda field, exporter: {'type': 'string', 'format': 'uuid'},
+    ChoiceField: _choice_schema,
+    ModelField: _model_schema,
+    ModelCollectionField: _collection_schema,
+    FieldCollectionField: _field_collection_schema,
+}
+
+
+def _container(parent, key, required):
+    # Returns the object or array schema for the nested source key ``key``
+    # inside ``parent``, creating it if needed.
+    if isinstance(key, int):
+        items = parent.setdefault('items', [])
+        while len(items) <= key:
+            items.append({})
+        child = items[key]
+        if required:
+            parent['minItems'] = max(parent.get('minItems', 0), key + 1)
+    else:
+        child = parent.setdefault('properties', {}).setdefault(key, {})
+        if required and key not in parent.setdefault('required', []):
+            parent['required'].append(key)
+    return child
+
+
+def _insert(root, path, schema, required):
+    # Places the schema of a field with a nested source at ``path``.
+    parent = root
+    for index, key in enumerate(path[:-1]):
+        parent = _container(parent, key, required)
+        parent['type'] = 'array' if isinstance(path[index + 1], int) \
+            else 'object'
+    last = path[-1]
+    _container(parent, last, required)
+    if isinstance(last, int):
+        parent['items'][last] = schema
+    else:
+        parent['properties'][last] = schema
+
+
+def _nullable(schema):
+    if 'type' in schema:
+        types = schema['type']
+        types = list(types) if isinstance(types, list) else [types]
+        schema['type'] = types + ['null']
+    elif 'enum' in schema:
+        schema['enum'] = schema['enum'] + [None]
+    elif schema:
+        schema = {'anyOf': [schema, {'type': 'null'}]}
+    return schema
+
+
+def _serial_default(field):
+    # Defaults are source data, so they are converted like it before being
+    # serialized, with a copy of the field to leave the original untouched.
+    converter = field.__copy__()
+    converter.populate(field.default)
+    return field.to_serial(converter.to_python())
+
+
+class _Exporter(object):
+
+    def __init__(self):
+        self.definitions = {}
+        self._names = {}
+
+    def reference(self, model_class):
+        name = self._names.get(model_class)
+        if name is None:
+            name = model_class.__name__
+            while name in self.definitions:
+                name += '_'
+            self._names[model_class] = name
+            self.definitions[name] = None
+            self.definitions[name] = self.model(model_class)
+        return {'$ref': '#/definitions/' + name}
+
+    def field(self, field):
+        for field_class in type(field).__mro__:
+            describe = FIELD_SCHEMAS.get(field_class)
+            if describe is not None:
+                return describe(field, self)
+        return {}
+
+    def model(self, model_class):
+        schema = {'type': 'object', 'properties': {}}
+        for name, field in model_class._clsfields.items():
+            field_schema = self.field(field)
+            if field.help_text:
+                field_schema['description'] = field.help_text
+            if field.default is not None and not callable(field.default):
+                field_schema['default'] = _serial_default(field)
+            # BooleanFields turn missing values and null into False, so
+            # they accept them whether or not they are required.
+            required = (field.required and field.default is None and
+                        not isinstance(field, BooleanField))
+            if not required:
+                field_schema = _nullable(field_schema)
+            path = source_path(field.source) or (field.source or name,)
+            _insert(schema, path, field_schema, required)
+        if not schema.get('required'):
+            schema.pop('required', None)
+        return schema
+
+
+def to_json_schema(model_class):
+    '''Returns a JSON Schema document (draft 7) describing the source data
+    accepted by ``model_class``.
+
+    Properties are named after the ``source`` of each field, fields that are
+    required and have no default are listed as required (except
+    :class:`~micromodels.BooleanField`, which turns missing values into
+    ``False``), and other fields also accept ``null``. Fields with a nested source are described inside
+    the objects and arrays along their path. Nested models are described
+    once each under ``definitions``.
+
+    '''
+    exporter = _Exporter()
+    schema = {'$schema': DRAFT, 'title': model_class.__name__}
+    schema.update(exporter.model(model_class))
+    if exporter.definitions:
+        schema['definitions'] = exporter.definitions
+    return schema
@@ -0,0 +1,200 @@
+"""Incremental decoding of a model whose JSON document holds a very large
+collection.
+
+:func:`stream_json` reads a single JSON object from a file, decoding the
+items of one :class:`~micromodels.ModelCollectionField` one at a time as they
+are iterated, so memory use does not depend on the length of the array::
+
+    >>> with open('export.json') as f:
+    ...     export = Export.stream_json(f, 'items')
+    ...     export.meta        # available immediately
+    ...     for item in export.items:
+    ...         handle(item)
+
+Fields whose keys come before the array in the document are set on the
+instance straight away. Fields whose keys come after it are set once the
+collection has been iterated to the end.
+
+"""
+import codecs
+import json
+
+from micromodels._compat import core
+from micromodels.fields import ModelCollectionField, source_path
+
+
+WHITESPACE = ' \t\n\r'
+# Characters that may continue a number. None of them can follow a complete
+# value in a valid document.
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+class JSONStreamReader(object):
+    """Reads JSON tokens and values from a file object, a chunk at a time."""
+
+    def __init__(self, fileobj, chunk_size=65536, parse_float=None):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder(parse_float=parse_float)
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self._text_decoder = None
+
+    def _fill(self):
+        chunk = self.fileobj.read(self.chunk_size)
+        if isinstance(chunk, bytes):
+            if self._text_decoder is None:
+                self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = self._text_decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        '''Skips whitespace and returns the next character, or an empty
+        string at the end of the file.
+
+        '''
+        while True:
+            while (self.pos < len(self.buffer) and
+                   self.buffer[self.pos] in WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError('Expected {0!r} at offset {1}, found {2!r}'
+                             .format(char, self.pos, found))
+        self.pos += 1
+
+    def value(self):
+        '''Decodes the next complete JSON value.'''
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+            else:
+                # A number cut off by the end of the buffer, even right after
+                # a '.' or an exponent, may continue in the next chunk.
+                if self.eof or (end < len(self.buffer) and
+                                self.buffer[end] not in NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            self._fill()
+
+    def members(self):
+        '''Yields the keys of the object at the current position, leaving
+        the reader positioned on each value in turn. The caller must consume
+        the value before asking for the next key.
+
+        '''
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def items(self):
+        '''Yields the values of the array at the current position.'''
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+class StreamingCollection(object):
+    """One-shot iterator over the items of a streamed collection field."""
+
+    def __init__(self, iterator):
+        self._iterator = iterator
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    next = __next__
+
+
+def _set_fields(instance, data):
+    for name, key, path in instance._decode_plan():
+        if key not in data:
+            continue
+        value = data[key] if path is None else core.get_path(data, path)
+        if value is not core.MISSING:
+            instance._set_field(name, instance._clsfields[name], value)
+
+
+def _stream_items(instance, field, reader, members):
+    for item in reader.items():
+        if not isinstance(item, field._wrapped_class):
+            item = field._wrapped_class.from_dict(item)
+        if field._related_name is not None:
+            item._set_backref(field._related_name, instance)
+        yield item
+    after = {}
+    for key in members:
+        after[key] = reader.value()
+    _set_fields(instance, after)
+
+
+def stream_json(model_class, fileobj, name, chunk_size=65536):
+    '''Decodes a ``model_class`` instance from the JSON object in
+    ``fileobj``, opened in text or binary mode. The collection field
+    ``name`` is set to a :class:`StreamingCollection`, which decodes the
+    items of the array as it is iterated.
+
+    '''
+    if model_class._meta.frozen:
+        raise TypeError('Frozen models cannot be streamed')
+    field = model_class._clsfields[name]
+    if not isinstance(field, ModelCollectionField):
+        raise TypeError("Field '{0}' is not a ModelCollectionField"
+                        .format(name))
+    if source_path(field.source) is not None:
+        raise TypeError("Field '{0}' has a nested source and cannot be "
+                        "streamed".format(name))
+    source = field.source or name
+
+    reader = JSONStreamReader(fileobj, chunk_size,
+                              parse_float=model_class._meta.parse_float)
+    members = reader.members()
+    before = {}
+    found = False
+    for key in members:
+        if key == source:
+            found = True
+            break
+        before[key] = reader.value()
+
+    instance = model_class._decode(before, False)
+    if found:
+        items = _stream_items(instance, field, reader, members)
+    else:
+        items = iter(())
+    instance.__dict__[name] = StreamingCollection(items)
+    return instance
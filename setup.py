@@ -1,6 +1,6 @@
 import os
 import re
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Extension
 from setuptools.command.test import test as TestCommand
 
 
@@ -34,17 +34,31 @@ def get_version():
     data = read_from(rel_file('micromodels', '__init__.py'))
     return re.search(r"__version__ = '([^']+)'", data).group(1)
 
+def get_ext_modules():
+    # The compiled core is opt-in, since it needs Cython and a C compiler.
+    # micromodels falls back to the pure Python core when it is missing.
+    if not os.environ.get('MICROMODELS_COMPILE'):
+        return []
+    from Cython.Build import cythonize
+    return cythonize(
+        [Extension('micromodels._ccore', [rel_file('micromodels', '_core.py')])],
+        compiler_directives={'language_level': 3},
+    )
+
+
 setup(
     name='micromodels',
     description='Declarative dictionary-based model classes for Python',
     long_description=get_long_description(),
     version=get_version(),
     packages=find_packages(),
+    ext_modules=get_ext_modules(),
     url='https://github.com/j4mie/micromodels/',
     author='Jamie Matthews',
     author_email='jamie.matthews@gmail.com',
     license='Public Domain',
-    install_requires=["aniso8601", "six"],
+    install_requires=["aniso8601", "six; python_version < '3'"],
+    extras_require={'msgpack': ["msgpack"]},
     tests_require=["nose"],
     cmdclass={'test': NoseTestCommand},
     classifiers=[
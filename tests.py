@@ -2,13 +2,47 @@ import datetime
 from aniso8601.timezone import parse_timezone
 from datetime import date
 import decimal
+import gc
+import io
+import os
+import pickle
+import subprocess
+import sys
 import unittest
 import uuid
+import weakref
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    asyncio = None
+try:
+    import enum
+except ImportError:
+    enum = None
 
 import micromodels
+from micromodels import _compat, binary, pool, records, schema
 from micromodels.models import json
 
 
+class CoreTestCase(unittest.TestCase):
+
+    def test_selected_core(self):
+        if os.environ.get('MICROMODELS_PURE_PYTHON'):
+            self.assertFalse(_compat.COMPILED)
+        if os.environ.get('MICROMODELS_REQUIRE_COMPILED'):
+            self.assertTrue(_compat.COMPILED)
+
+    def test_force_pure_python(self):
+        env = dict(os.environ, MICROMODELS_PURE_PYTHON='1')
+        output = subprocess.check_output(
+            [sys.executable, '-c',
+             'from micromodels import _compat; print(_compat.core.__name__)'],
+            env=env)
+        self.assertEqual(output.strip(), b'micromodels._core')
+
+
 class ClassCreationTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -48,6 +82,35 @@ class ClassCreationTestCase(unittest.TestCase):
         self.assertEqual(self.instance.field_with_default, date.today())
 
 
+class BuildClassTestCase(unittest.TestCase):
+
+    def test_build_class(self):
+        Person = micromodels.Model.build_class('Person', {
+            'name': micromodels.CharField(),
+            'age': micromodels.IntegerField(),
+        }, meta={'frozen': True})
+        self.assertEqual(Person.__name__, 'Person')
+        self.assertEqual(list(Person._clsfields), ['name', 'age'])
+        self.assertTrue(Person._meta.frozen)
+        person = Person.from_dict({'name': 'Eric', 'age': '18'})
+        self.assertEqual(person.to_dict(), {'name': 'Eric', 'age': 18})
+
+    def test_inherited_fields(self):
+        Base = micromodels.Model.build_class('Base', {
+            'a': micromodels.CharField(), 'b': micromodels.CharField()})
+        Mixin = micromodels.Model.build_class('Mixin', {
+            'c': micromodels.CharField()})
+        override = micromodels.IntegerField()
+
+        class Child(Base, Mixin):
+            d = micromodels.CharField()
+            a = override
+
+        self.assertEqual(list(Child._clsfields), ['a', 'b', 'c', 'd'])
+        self.assertIs(Child._clsfields['a'], override)
+        self.assertEqual(list(Base._clsfields), ['a', 'b'])
+
+
 class BaseFieldTestCase(unittest.TestCase):
 
     def test_field_without_provided_source(self):
@@ -85,6 +148,80 @@ class CharFieldTestCase(unittest.TestCase):
         self.assertEqual(self.field.to_python(), '')
 
 
+class InternTestCase(unittest.TestCase):
+
+    def distinct(self, text):
+        # Build an equal string that is a different object.
+        return ''.join(list(text))
+
+    def test_char_field_intern(self):
+        table = micromodels.InternTable()
+        field = micromodels.CharField(intern=table)
+        field.populate(self.distinct('status-ok'))
+        first = field.to_python()
+        field.populate(self.distinct('status-ok'))
+        self.assertIs(field.to_python(), first)
+        self.assertEqual(len(table), 1)
+
+    def test_default_table(self):
+        field = micromodels.CharField(intern=True)
+        self.assertIs(field._intern_table,
+                      micromodels.fields.default_intern_table)
+
+    def test_table_bounds(self):
+        table = micromodels.InternTable(maxsize=1, max_length=3)
+        self.assertEqual(table.intern('long string'), 'long string')
+        first = table.intern(self.distinct('ab'))
+        self.assertIs(table.intern(self.distinct('ab')), first)
+        value = self.distinct('cd')
+        self.assertIs(table.intern(value), value)
+        self.assertEqual(len(table), 1)
+
+    def test_model_policy(self):
+        table = micromodels.InternTable()
+
+        class Base(micromodels.Model):
+            country = micromodels.CharField()
+
+        class User(Base):
+            name = micromodels.CharField(intern=False)
+
+            class Meta:
+                intern_strings = table
+
+        first = User.from_dict({'country': self.distinct('FR'),
+                                'name': self.distinct('Eric')})
+        second = User.from_dict({'country': self.distinct('FR'),
+                                 'name': self.distinct('Eric')})
+        self.assertIs(first.country, second.country)
+        self.assertIsNot(first.name, second.name)
+        self.assertIsNone(Base._clsfields['country'].intern)
+
+
+class ChoiceFieldTestCase(unittest.TestCase):
+
+    def test_choices(self):
+        field = micromodels.ChoiceField(['active', 'inactive'])
+        field.populate(''.join(['act', 'ive']))
+        self.assertIs(field.to_python(), field._choices['active'])
+        field.populate('deleted')
+        self.assertRaises(ValueError, field.to_python)
+
+    @unittest.skipIf(enum is None, 'enum is not available')
+    def test_enum(self):
+        class Status(enum.Enum):
+            ACTIVE = 'active'
+            INACTIVE = 'inactive'
+
+        class Account(micromodels.Model):
+            status = micromodels.ChoiceField(Status)
+
+        account = Account.from_dict({'status': 'inactive'})
+        self.assertIs(account.status, Status.INACTIVE)
+        account.status = Status.ACTIVE
+        self.assertEqual(account.to_dict(serial=True), {'status': 'active'})
+
+
 class IntegerFieldTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -169,6 +306,53 @@ class DecimalFieldTestCase(unittest.TestCase):
         self.field.populate(None)
         self.assertEqual(self.field.to_python(), decimal.Decimal('1.23'))
 
+    def test_quantize(self):
+        field = micromodels.DecimalField(places=2,
+                                         rounding=decimal.ROUND_HALF_UP)
+        field.populate('2.675')
+        self.assertEqual(str(field.to_python()), '2.68')
+        field.populate(1)
+        self.assertEqual(str(field.to_python()), '1.00')
+
+    def test_context(self):
+        field = micromodels.DecimalField(context=decimal.Context(prec=3))
+        field.populate(decimal.Decimal('3.14159'))
+        self.assertEqual(str(field.to_python()), '3.14')
+
+    def test_serialization(self):
+        self.assertEqual(self.field.to_serial(decimal.Decimal('0.10')),
+                         '0.10')
+
+    def test_parse_float_option(self):
+        class Quote(micromodels.Model):
+            price = micromodels.DecimalField()
+
+            class Meta:
+                parse_float = decimal.Decimal
+
+        exact = '0.1000000000000000055511151231257827'
+        quote = Quote.from_dict('{"price": %s}' % exact, is_json=True)
+        self.assertEqual(quote.price, decimal.Decimal(exact))
+        self.assertEqual(json.loads(quote.to_json()), {'price': exact})
+
+    def test_parse_float_with_other_fields(self):
+        class Reading(micromodels.Model):
+            value = micromodels.DecimalField()
+            raw = micromodels.BaseField()
+            extra = micromodels.JSONField()
+
+            class Meta:
+                parse_float = decimal.Decimal
+
+        exact = '0.10000000000000000001'
+        reading = Reading.from_dict(
+            '{"value": 1.5, "raw": %s, "extra": {"scale": 0.5}}' % exact,
+            is_json=True)
+        self.assertEqual(reading.raw, decimal.Decimal(exact))
+        self.assertEqual(json.loads(reading.to_json()),
+                         {'value': '1.5', 'raw': exact,
+                          'extra': '{"scale": "0.5"}'})
+
 
 class BooleanFieldTestCase(unittest.TestCase):
 
@@ -214,6 +398,22 @@ class BooleanFieldTestCase(unittest.TestCase):
         self.field.populate(None)
         self.assertEqual(self.field.to_python(), True)
 
+    def test_subclass_conversion(self):
+        """Subclasses of the input types should convert like their base"""
+        class Text(str):
+            pass
+
+        self.field.populate(Text(' TRUE '))
+        self.assertIs(self.field.to_python(), True)
+        self.field.populate(0.5)
+        self.assertIs(self.field.to_python(), True)
+        self.assertIn(Text, micromodels.BooleanField.converters)
+
+    def test_callable_default(self):
+        self.field.default = lambda: 'true'
+        self.field.populate(None)
+        self.assertIs(self.field.data, True)
+
 
 class DateTimeFieldTestCase(unittest.TestCase):
 
@@ -362,6 +562,86 @@ class UUIDFieldTestCase(unittest.TestCase):
         self.field.populate('101469a9-4adb-492a-9d7f-88c9c039ceb4')
         self.assertIsInstance(self.field.to_python(), uuid.UUID)
 
+    def test_convert_many(self):
+        texts = ['101469a9-4adb-492a-9d7f-88c9c039ceb4',
+                 '{0bd3cd5e-e1d5-4a5d-bd6c-7d1a63fb6d72}',
+                 'urn:uuid:4dd9b2c7-1ec1-4ea2-9c39-1e6e1b0a5a8a']
+        expected = [uuid.UUID(text) for text in texts]
+        self.assertEqual(self.field.convert_many(texts), expected)
+        compact = micromodels.UUIDField(compact=True)
+        self.assertEqual(compact.convert_many(texts),
+                         [value.int for value in expected])
+        self.assertRaises(ValueError, compact.convert_many, ['101469a9'])
+
+
+class CompactUUIDFieldTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Event(micromodels.Model):
+            id = micromodels.UUIDField(compact=True)
+            parent = micromodels.UUIDField(compact=True)
+
+        self.Event = Event
+        self.value = uuid.UUID('101469a9-4adb-492a-9d7f-88c9c039ceb4')
+
+    def test_stores_integer(self):
+        event = self.Event.from_dict({'id': str(self.value)})
+        self.assertEqual(event.__dict__['id'], self.value.int)
+        self.assertEqual(event.id, self.value)
+        self.assertIsInstance(event.id, uuid.UUID)
+        self.assertIsNone(event.parent)
+
+    def test_inputs(self):
+        for data in (self.value, self.value.int, self.value.hex,
+                     str(self.value).upper()):
+            self.assertEqual(self.Event(id=data).id, self.value)
+        self.assertRaises(ValueError, self.Event, id=-1)
+        self.assertRaises(ValueError, self.Event, id='101469a9')
+
+    def test_assignment(self):
+        event = self.Event()
+        event.id = str(self.value)
+        self.assertEqual(event.id, self.value)
+
+    def test_overridden_in_subclass(self):
+        class NumberedEvent(self.Event):
+            id = micromodels.IntegerField()
+
+        event = NumberedEvent.from_dict({'id': 5, 'parent': self.value.hex})
+        self.assertEqual(event.id, 5)
+        self.assertEqual(event.parent, self.value)
+        self.assertIsNone(NumberedEvent().id)
+        event.id = '6'
+        self.assertEqual(event.id, 6)
+
+    def test_added_field(self):
+        event = self.Event()
+        event.add_field('other', str(self.value),
+                        micromodels.UUIDField(compact=True))
+        self.assertEqual(event.other, self.value)
+        self.assertEqual(event.to_dict(serial=True)['other'], self.value.hex)
+
+    def test_serialization(self):
+        event = self.Event.from_dict({'id': self.value.hex})
+        self.assertEqual(event.to_dict(serial=True),
+                         {'id': self.value.hex, 'parent': None})
+        self.assertEqual(event.to_dict()['id'], self.value)
+        self.assertEqual(event, self.Event(id=self.value))
+
+    def test_default(self):
+        class Event(micromodels.Model):
+            id = micromodels.UUIDField(compact=True, default=self.value)
+
+        self.assertEqual(Event().id, self.value)
+
+    def test_frozen(self):
+        class Event(micromodels.FrozenModel):
+            id = micromodels.UUIDField(compact=True)
+
+        event = Event(id=self.value)
+        self.assertEqual(event.replace().id, self.value)
+        self.assertEqual(hash(event), hash(Event(id=self.value.hex)))
+
 
 class ModelFieldTestCase(unittest.TestCase):
 
@@ -497,6 +777,263 @@ class ModelCollectionFieldTestCase(unittest.TestCase):
         self.assertEqual(processed, data)
 
 
+class LazyModelCollectionFieldTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Post(micromodels.Model):
+            title = micromodels.CharField()
+            views = micromodels.IntegerField()
+
+            @classmethod
+            def from_dict(cls, *args, **kwargs):
+                Post.decoded += 1
+                return super(Post, cls).from_dict(*args, **kwargs)
+
+        Post.decoded = 0
+
+        class User(micromodels.Model):
+            name = micromodels.CharField()
+            posts = micromodels.ModelCollectionField(Post, lazy=True,
+                                                     related_name='author')
+
+        self.Post = Post
+        self.data = {
+            'name': 'Eric',
+            'posts': [{'title': 'Post #%d' % i, 'views': str(i)}
+                      for i in range(5)],
+        }
+        self.user = User.from_dict(self.data)
+
+    def test_items_decoded_on_access(self):
+        posts = self.user.posts
+        self.assertEqual(len(posts), 5)
+        self.assertEqual(self.Post.decoded, 0)
+        self.assertEqual(posts[-1].views, 4)
+        self.assertIs(posts[4], posts[-1])
+        self.assertIs(posts[4].author, self.user)
+        self.assertEqual(self.Post.decoded, 1)
+        self.assertEqual([post.views for post in posts], list(range(5)))
+        self.assertEqual(self.Post.decoded, 5)
+
+    def test_slicing(self):
+        first = self.user.posts[0]
+        head = self.user.posts[:2]
+        self.assertEqual(len(head), 2)
+        self.assertIs(head[0], first)
+        self.assertEqual(self.Post.decoded, 1)
+
+    def test_serialization_does_not_depend_on_access(self):
+        self.user.posts[1].views = 10
+        serial = self.user.to_dict(serial=True)['posts']
+        self.assertEqual(serial[1], {'title': 'Post #1', 'views': 10})
+        self.assertEqual(serial[2], {'title': 'Post #2', 'views': 2})
+
+        class Address(micromodels.Model):
+            zip = micromodels.CharField(source='postcode')
+
+        class Person(micromodels.Model):
+            addresses = micromodels.ModelCollectionField(Address, lazy=True)
+
+        person = Person.from_dict({'addresses': [{'postcode': '1'},
+                                                 {'postcode': '2'}]})
+        person.addresses[0]
+        self.assertEqual(person.to_dict(serial=True)['addresses'],
+                         [{'zip': '1'}, {'zip': '2'}])
+
+        class Counter(micromodels.Model):
+            n = micromodels.BaseField(default=0)
+
+        class Counters(micromodels.Model):
+            items = micromodels.ModelCollectionField(Counter, lazy=True)
+
+        counters = Counters.from_dict({'items': [{'n': None}, {'n': None}]})
+        counters.items[0]
+        self.assertEqual(counters.to_dict(serial=True)['items'],
+                         [{'n': 0}, {'n': 0}])
+
+    def test_untouched_items_serialized_from_source(self):
+        class Tag(micromodels.Model):
+            name = micromodels.BaseField()
+            count = micromodels.BaseField()
+
+        class Article(micromodels.Model):
+            tags = micromodels.ModelCollectionField(Tag, lazy=True)
+
+        data = {'tags': [{'name': 'a', 'count': 1}, {'name': 'b', 'count': 2},
+                         {'name': 'c'}]}
+        article = Article.from_dict(data)
+        serial = article.to_dict(serial=True)['tags']
+        self.assertIs(serial[0], data['tags'][0])
+        self.assertEqual(serial[2], {'name': 'c', 'count': None})
+        self.assertEqual(article.tags.decoded(), [article.tags[2]])
+
+    def test_change_tracking_skips_undecoded_items(self):
+        self.assertEqual(self.user.changed_fields(), set())
+        self.user.posts[3].title = 'Edited'
+        self.assertEqual(self.user.changed_fields(), set(['posts']))
+        self.assertEqual(self.Post.decoded, 1)
+
+    def test_equality_with_list(self):
+        posts = [self.Post.from_dict(item) for item in self.data['posts']]
+        self.assertEqual(self.user.posts, posts)
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Item(micromodels.Model):
+            id = micromodels.IntegerField()
+            price = micromodels.FloatField()
+
+        class Export(micromodels.Model):
+            name = micromodels.CharField()
+            total = micromodels.IntegerField()
+            items = micromodels.ModelCollectionField(Item, source='rows',
+                                                     related_name='export')
+
+        self.Export = Export
+        self.items = [{'id': i, 'price': i * 1.25} for i in range(50)]
+        self.document = json.dumps({'name': u'caf\xe9', 'rows': self.items,
+                                    'total': 50}, indent=1)
+
+    def test_stream_from_text(self):
+        stream = io.StringIO(self.document)
+        export = self.Export.stream_json(stream, 'items', chunk_size=7)
+        self.assertEqual(export.name, u'caf\xe9')
+        self.assertIsNone(export.total)
+        items = list(export.items)
+        self.assertEqual([item.to_dict() for item in items], self.items)
+        self.assertIs(items[0].export, export)
+        self.assertEqual(export.total, 50)
+
+    def test_stream_from_bytes(self):
+        stream = io.BytesIO(self.document.encode('utf-8'))
+        export = self.Export.stream_json(stream, 'items', chunk_size=5)
+        self.assertEqual(export.name, u'caf\xe9')
+        self.assertEqual(len(list(export.items)), 50)
+
+    def test_items_decoded_incrementally(self):
+        stream = io.StringIO(self.document)
+        export = self.Export.stream_json(stream, 'items', chunk_size=16)
+        next(export.items)
+        self.assertTrue(stream.tell() < len(self.document) / 2)
+
+    def test_numbers_split_across_chunks(self):
+        class Report(micromodels.Model):
+            rate = micromodels.FloatField()
+            items = micromodels.ModelCollectionField(self.Export)
+            total = micromodels.FloatField()
+
+        document = ('{"rate": 12.5e3, "items": [{"total": 7}, '
+                    '{"total": -10}], "total": 3.25}')
+        for chunk_size in range(1, len(document) + 1):
+            report = Report.stream_json(io.StringIO(document), 'items',
+                                        chunk_size=chunk_size)
+            self.assertEqual(report.rate, 12500.0)
+            self.assertEqual([item.total for item in report.items], [7, -10])
+            self.assertEqual(report.total, 3.25)
+
+    def test_bookkeeping_does_not_consume_items(self):
+        stream = io.StringIO(self.document)
+        export = self.Export.stream_json(stream, 'items')
+        self.assertEqual(export.changed_fields(), set())
+        export.reset_changes()
+        export.content_hash()
+        export._clone()
+        self.assertEqual(len(list(export.items)), 50)
+
+    def test_missing_collection(self):
+        stream = io.StringIO(json.dumps({'name': 'x', 'total': 0}))
+        export = self.Export.stream_json(stream, 'items')
+        self.assertEqual(list(export.items), [])
+        self.assertEqual(export.total, 0)
+
+    def test_invalid_document(self):
+        stream = io.StringIO('{"rows": [{"id": 1}, ')
+        export = self.Export.stream_json(stream, 'items')
+        self.assertRaises(ValueError, list, export.items)
+
+
+# Defined at module level so that their instances can be pickled.
+class PickledComment(micromodels.Model):
+    text = micromodels.CharField()
+
+
+class PickledUser(micromodels.Model):
+    name = micromodels.CharField()
+    comments = micromodels.ModelCollectionField(PickledComment,
+                                                related_name='author')
+    drafts = micromodels.ModelCollectionField(PickledComment,
+                                              related_name='author', lazy=True)
+
+
+class BackReferenceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Comment(micromodels.Model):
+            text = micromodels.CharField()
+
+        class Profile(micromodels.Model):
+            bio = micromodels.CharField()
+
+        class User(micromodels.Model):
+            name = micromodels.CharField()
+            profile = micromodels.ModelField(Profile, related_name='user')
+            comments = micromodels.ModelCollectionField(
+                Comment, related_name='author')
+            drafts = micromodels.ModelCollectionField(
+                Comment, related_name='author', lazy=True)
+
+        self.User = User
+        self.data = {'name': 'Eric', 'profile': {'bio': 'Hi'},
+                     'comments': [{'text': 'First'}],
+                     'drafts': [{'text': 'Draft'}]}
+        gc.collect()
+        gc.disable()
+
+    def tearDown(self):
+        gc.enable()
+
+    def test_back_references(self):
+        user = self.User.from_dict(self.data)
+        self.assertIs(user.profile.user, user)
+        self.assertIs(user.comments[0].author, user)
+        self.assertIs(user.drafts[0].author, user)
+        clone = user._clone()
+        self.assertIs(clone.comments[0].author, clone)
+        self.assertIs(clone.drafts[0].author, clone)
+
+    def test_no_reference_cycles(self):
+        user = self.User.from_dict(self.data)
+        clone = user._clone()
+        refs = [weakref.ref(instance) for instance in (
+            user, user.profile, user.comments[0], user.drafts[0],
+            clone, clone.profile, clone.comments[0], clone.drafts[0])]
+        del user, clone
+        # Everything was freed by reference counting alone.
+        self.assertEqual([ref() for ref in refs], [None] * len(refs))
+        self.assertEqual(gc.collect(), 0)
+
+    def test_pickle(self):
+        user = PickledUser.from_dict(self.data)
+        user.drafts[0]
+        loaded = pickle.loads(pickle.dumps(user))
+        self.assertEqual(loaded, user)
+        self.assertIs(loaded.comments[0].author, loaded)
+        self.assertIs(loaded.drafts[0].author, loaded)
+        self.assertIs(loaded._clsfields['comments']._related_obj, loaded)
+        loaded.comments = [{'text': 'New'}]
+        self.assertIs(loaded.comments[0].author, loaded)
+        comment = pickle.loads(pickle.dumps(user.comments[0]))
+        self.assertIsNone(comment.author)
+
+    def test_dangling_back_reference(self):
+        user = self.User.from_dict(self.data)
+        profile = user.profile
+        del user
+        self.assertIsNone(profile.user)
+
+
 class FieldCollectionFieldTestCase(unittest.TestCase):
 
     def test_field_collection_field_creation(self):
@@ -592,6 +1129,728 @@ class ModelTestCase(unittest.TestCase):
         instance.birthday = today
         self.assertEqual(instance.to_dict()['birthday'], today)
 
+    def test_subclass_init_runs(self):
+        class CachedPerson(self.Person):
+            def __init__(self, **values):
+                super(CachedPerson, self).__init__(**values)
+                self.cache = {}
+
+        for instance in (CachedPerson.from_dict(self.data),
+                         CachedPerson.from_kwargs(**self.data),
+                         CachedPerson.from_dict(self.data, only=['name'])):
+            self.assertEqual(instance.cache, {})
+            self.assertEqual(instance.name, 'Eric')
+        self.assertEqual(CachedPerson.validate_many([self.data]), [])
+
+
+class SourcePathTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Account(micromodels.Model):
+            id = micromodels.IntegerField()
+            name = micromodels.CharField(source='user.profile.name')
+            email = micromodels.CharField(source=('user', 'emails', 0),
+                                          required=False)
+            score = micromodels.IntegerField(source='stats.1', default=0)
+            dotted = micromodels.CharField(source=('a.b',), required=False)
+
+        self.Account = Account
+        self.data = {
+            'id': 1,
+            'user': {'profile': {'name': 'Ann'}, 'emails': ['ann@example']},
+            'stats': [3, 7],
+            'a.b': 'literal',
+        }
+
+    def test_nested_source(self):
+        account = self.Account.from_dict(self.data)
+        self.assertEqual(account.to_dict(), {
+            'id': 1, 'name': 'Ann', 'email': 'ann@example', 'score': 7,
+            'dotted': 'literal'})
+
+    def test_missing_path_uses_default(self):
+        account = self.Account.from_dict({'id': 1, 'user': None,
+                                          'stats': []})
+        self.assertIsNone(account.name)
+        self.assertIsNone(account.email)
+        self.assertEqual(account.score, 0)
+
+    def test_digits_match_object_keys(self):
+        account = self.Account.from_dict(dict(self.data,
+                                              stats={'1': 9, '2': 4}))
+        self.assertEqual(account.score, 9)
+        self.assertEqual(micromodels.models.core.get_path(
+            {'users': {'42': {'name': 'Ann'}}}, ('users', 42, 'name')), 'Ann')
+
+    def test_digits_keep_leading_zeros(self):
+        class Agent(micromodels.Model):
+            name = micromodels.CharField(source='codes.007')
+
+        agent = Agent.from_dict({'codes': {'7': 'Q', '007': 'Bond'}})
+        self.assertEqual(agent.name, 'Bond')
+        agent = Agent.from_dict({'codes': ['a'] * 7 + ['Bond']})
+        self.assertEqual(agent.name, 'Bond')
+
+    def test_update(self):
+        account = self.Account.from_dict(self.data)
+        account.update({'user': {'emails': ['new@example']}})
+        self.assertEqual(account.email, 'new@example')
+        self.assertEqual(account.name, 'Ann')
+
+    def test_validate_many_paths(self):
+        errors = self.Account.validate_many([
+            {'id': 1, 'user': {'profile': {}}}])
+        self.assertEqual(errors, [('/0/user/profile/name',
+                                   'This field is required.')])
+
+    def test_json_schema(self):
+        properties = self.Account.json_schema()['properties']
+        self.assertEqual(properties['user']['required'], ['profile'])
+        self.assertEqual(
+            properties['user']['properties']['profile']['properties'],
+            {'name': {'type': 'string'}})
+        self.assertEqual(properties['stats']['type'], 'array')
+        self.assertEqual(properties['stats']['items'][1],
+                         {'type': ['integer', 'null'], 'default': 0})
+        self.assertIn('a.b', properties)
+
+
+class ProjectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Author(micromodels.Model):
+            name = micromodels.CharField()
+            email = micromodels.CharField()
+
+        class Post(micromodels.Model):
+            id = micromodels.IntegerField()
+            title = micromodels.CharField()
+            author = micromodels.ModelField(Author, related_name='post')
+            comments = micromodels.ModelCollectionField(Author)
+
+        self.Post = Post
+        self.data = {
+            'id': '1', 'title': 'Hello',
+            'author': {'name': 'Ann', 'email': 'ann@example'},
+            'comments': [{'name': 'Bob', 'email': 'bob@example'}],
+        }
+
+    def test_decode_only(self):
+        post = self.Post.from_dict(self.data,
+                                   only=['id', 'author.name', 'comments'])
+        self.assertNotIn('title', post.__dict__)
+        self.assertNotIn('email', post.author.__dict__)
+        self.assertIs(post.author.post, post)
+        self.assertEqual(post.id, 1)
+        self.assertEqual(post.author.name, 'Ann')
+        self.assertEqual(post.comments[0].email, 'bob@example')
+        self.assertIsNone(post.title)
+
+    def test_decode_exclude(self):
+        post = self.Post.from_dict(json.dumps(self.data), is_json=True,
+                                   exclude=['title', 'comments.email'])
+        self.assertNotIn('title', post.__dict__)
+        self.assertNotIn('email', post.comments[0].__dict__)
+        self.assertEqual(post.author.email, 'ann@example')
+
+    def test_to_dict(self):
+        post = self.Post.from_dict(self.data)
+        post.add_field('views', '3', micromodels.IntegerField())
+        self.assertEqual(
+            post.to_dict(serial=True, only=['id', 'author.name', 'views']),
+            {'id': 1, 'author': {'name': 'Ann'}, 'views': 3})
+        self.assertEqual(
+            post.to_dict(exclude=['author', 'comments.name', 'views']),
+            {'id': 1, 'title': 'Hello',
+             'comments': [{'email': 'bob@example'}]})
+        self.assertRaises(ValueError, post.to_dict, only=['id'],
+                          only_changed=True)
+
+    def test_projection_cached(self):
+        first = self.Post._projection(['id', 'author.name'])
+        second = self.Post._projection(('author.name', 'id'))
+        self.assertIs(first, second)
+        self.assertIsNot(first, self.Post._projection(['id']))
+
+    def test_nested_name_of_scalar_field(self):
+        self.assertRaises(ValueError, self.Post.from_dict, self.data,
+                          only=['title.length'])
+
+    def test_unknown_names(self):
+        post = self.Post.from_dict(self.data)
+        self.assertRaises(ValueError, self.Post.from_dict, self.data,
+                          only=['nmae'])
+        self.assertRaises(ValueError, self.Post.from_dict, self.data,
+                          exclude=['author.nmae'])
+        self.assertRaises(ValueError, post.to_dict, only=['id', 'views'])
+        post.add_field('views', 3, micromodels.IntegerField())
+        self.assertEqual(post.to_dict(only=['id', 'views']),
+                         {'id': 1, 'views': 3})
+
+    def test_projection_cache_bounded(self):
+        for index in range(micromodels.models.MAX_PROJECTIONS + 10):
+            self.Post._projection(exclude=['x%d' % index])
+        self.assertEqual(len(self.Post._projections),
+                         micromodels.models.MAX_PROJECTIONS)
+
+
+class ModelUpdateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Address(micromodels.Model):
+            city = micromodels.CharField()
+            zip = micromodels.CharField(source='postcode')
+
+        class Person(micromodels.Model):
+            name = micromodels.CharField()
+            age = micromodels.IntegerField(default=1)
+            address = micromodels.ModelField(Address)
+
+        self.Person = Person
+        self.person = Person.from_dict({
+            'name': 'Eric', 'age': 18,
+            'address': {'city': 'Paris', 'postcode': '75001'},
+        })
+
+    def test_only_patched_fields_change(self):
+        self.person.update({'name': 'John'})
+        self.assertEqual(self.person.name, 'John')
+        self.assertEqual(self.person.age, 18)
+        self.assertEqual(self.person.address.city, 'Paris')
+
+    def test_conversion_and_source(self):
+        self.person.update(json.dumps({'age': '19',
+                                       'address': {'postcode': '75002'}}),
+                           is_json=True)
+        self.assertEqual(self.person.age, 19)
+        self.assertEqual(self.person.address.zip, '75002')
+        self.assertEqual(self.person.address.city, 'Paris')
+
+    def test_null_resets_to_default(self):
+        self.person.update({'age': None, 'address': None})
+        self.assertEqual(self.person.age, 1)
+        self.assertIsNone(self.person.address.city)
+
+    def test_null_along_nested_source(self):
+        class Settings(micromodels.Model):
+            z = micromodels.IntegerField(source='deep.z', default=0)
+            first = micromodels.IntegerField(source='items.0.n',
+                                             required=False)
+
+        data = {'deep': {'z': 5}, 'items': [{'n': 1}]}
+        for patch, z, first in (({'deep': {'other': 1}}, 5, 1),
+                                ({'deep': None}, 0, 1),
+                                ({'deep': 3}, 0, 1),
+                                ({'items': []}, 5, None),
+                                ({'items': [{}]}, 5, None)):
+            settings = Settings.from_dict(data)
+            settings.update(patch)
+            self.assertEqual((settings.z, settings.first), (z, first), patch)
+
+    def test_unknown_keys_ignored(self):
+        self.person.update({'unknown': 1})
+        self.assertFalse('unknown' in self.person.__dict__)
+
+    def test_extra_field(self):
+        self.person.add_field('gender', 'male', micromodels.CharField())
+        self.person.update({'gender': 'female'})
+        self.assertEqual(self.person.gender, 'female')
+
+
+class ChangeTrackingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Post(micromodels.Model):
+            title = micromodels.CharField()
+
+        class Address(micromodels.Model):
+            city = micromodels.CharField()
+            street = micromodels.CharField()
+
+        class User(micromodels.Model):
+            name = micromodels.CharField()
+            age = micromodels.IntegerField(default=1)
+            address = micromodels.ModelField(Address)
+            posts = micromodels.ModelCollectionField(Post)
+
+        self.user = User.from_dict({
+            'name': 'Eric',
+            'address': {'city': 'Paris', 'street': 'Rue'},
+            'posts': [{'title': 'Post #1'}, {'title': 'Post #2'}],
+        })
+
+    def test_unchanged_after_decode(self):
+        self.assertEqual(self.user.changed_fields(), set())
+        self.assertEqual(self.user.age, 1)
+        self.assertEqual(self.user.to_dict(only_changed=True), {})
+
+    def test_assignment_tracked(self):
+        self.user.age = '30'
+        self.assertEqual(self.user.changed_fields(), set(['age']))
+        self.assertEqual(self.user.to_dict(serial=True, only_changed=True),
+                         {'age': 30})
+
+    def test_nested_model_changes(self):
+        self.user.address.city = 'Lyon'
+        self.assertEqual(self.user.changed_fields(), set(['address']))
+        self.assertEqual(self.user.to_dict(serial=True, only_changed=True),
+                         {'address': {'city': 'Lyon'}})
+
+    def test_nested_collection_changes(self):
+        self.user.posts[1].title = 'Edited'
+        self.assertEqual(self.user.changed_fields(), set(['posts']))
+        self.assertEqual(
+            self.user.to_dict(serial=True, only_changed=True),
+            {'posts': [{'title': 'Post #1'}, {'title': 'Edited'}]}
+        )
+
+    def test_add_field_tracked(self):
+        self.user.add_field('gender', 'male', micromodels.CharField())
+        self.assertEqual(self.user.to_dict(only_changed=True),
+                         {'gender': 'male'})
+
+    def test_reset_changes(self):
+        self.user.name = 'John'
+        self.user.address.city = 'Lyon'
+        self.user.reset_changes()
+        self.assertEqual(self.user.changed_fields(), set())
+        self.assertFalse(self.user.address._has_changes())
+
+
+class EqualityTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Post(micromodels.Model):
+            title = micromodels.CharField()
+
+        class User(micromodels.Model):
+            name = micromodels.CharField()
+            joined = micromodels.DateField()
+            best = micromodels.ModelField(Post)
+            posts = micromodels.ModelCollectionField(Post)
+
+        self.User = User
+        self.data = {
+            'name': 'Eric',
+            'joined': '2011-01-30',
+            'best': {'title': 'Post #1'},
+            'posts': [{'title': 'Post #1'}, {'title': 'Post #2'}],
+        }
+
+    def test_equality(self):
+        first = self.User.from_dict(self.data)
+        second = self.User.from_dict(self.data)
+        self.assertEqual(first, second)
+        self.assertFalse(first != second)
+        second.posts[1].title = 'Edited'
+        self.assertNotEqual(first, second)
+
+    def test_different_classes_not_equal(self):
+        class Other(micromodels.Model):
+            name = micromodels.CharField()
+
+        class Same(micromodels.Model):
+            name = micromodels.CharField()
+
+        self.assertNotEqual(Other.from_dict({'name': 'a'}),
+                            Same.from_dict({'name': 'a'}))
+
+    def test_content_hash(self):
+        first = self.User.from_dict(self.data)
+        second = self.User.from_dict(self.data)
+        self.assertEqual(first.content_hash(), second.content_hash())
+        self.assertEqual(len(set([first.content_hash(),
+                                  second.content_hash()])), 1)
+
+    def test_content_hash_invalidated(self):
+        user = self.User.from_dict(self.data)
+        original = user.content_hash()
+        user.name = 'John'
+        self.assertNotEqual(user.content_hash(), original)
+        user.name = 'Eric'
+        self.assertEqual(user.content_hash(), original)
+        user.best.title = 'Edited'
+        self.assertNotEqual(user.content_hash(), original)
+
+    def test_instances_unhashable(self):
+        self.assertRaises(TypeError, hash, self.User())
+
+
+class DecodeCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Post(micromodels.Model):
+            title = micromodels.CharField()
+
+        class User(micromodels.Model):
+            name = micromodels.CharField()
+            tags = micromodels.FieldCollectionField(micromodels.CharField())
+            posts = micromodels.ModelCollectionField(Post,
+                                                     related_name='author')
+
+            class Meta:
+                decode_cache = 2
+
+        self.User = User
+        self.data = {'name': 'Eric', 'tags': ['a'],
+                     'posts': [{'title': 'Post #1'}]}
+
+    def test_disabled_by_default(self):
+        class Plain(micromodels.Model):
+            name = micromodels.CharField()
+
+        self.assertIsNone(Plain.decode_cache())
+
+    def test_hits_and_misses(self):
+        text = json.dumps(self.data)
+        first = self.User.from_dict(text, is_json=True)
+        second = self.User.from_dict(text, is_json=True)
+        third = self.User.from_dict(self.data)
+        self.assertEqual(first, second)
+        self.assertEqual(second, third)
+        info = self.User.decode_cache().info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_returned_instances_independent(self):
+        first = self.User.from_dict(self.data)
+        first.name = 'John'
+        first.tags.append('b')
+        first.posts[0].title = 'Edited'
+        second = self.User.from_dict(self.data)
+        self.assertEqual(second.to_dict(serial=True), self.data)
+        self.assertIs(second.posts[0].author, second)
+        self.assertEqual(second.changed_fields(), set())
+
+    def test_lru_eviction(self):
+        for name in ['a', 'b', 'a', 'c']:
+            self.User.from_dict({'name': name})
+        cache = self.User.decode_cache()
+        self.assertEqual(cache.info().currsize, 2)
+        self.User.from_dict({'name': 'a'})
+        self.User.from_dict({'name': 'b'})
+        self.assertEqual(cache.info().hits, 2)
+
+    def test_invalidation(self):
+        self.User.from_dict(self.data)
+        cache = self.User.decode_cache()
+        cache.invalidate(self.data)
+        self.assertEqual(cache.info().currsize, 0)
+        self.User.from_dict(self.data)
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 2, 0))
+
+    def test_subclass_has_own_cache(self):
+        class Admin(self.User):
+            pass
+
+        self.assertIsNot(Admin.decode_cache(), self.User.decode_cache())
+        self.assertEqual(Admin.decode_cache().maxsize, 2)
+
+
+class ModelPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Event(micromodels.Model):
+            name = micromodels.CharField()
+            count = micromodels.IntegerField(default=0)
+
+        self.Event = Event
+
+    def test_decode(self):
+        with self.Event.pool() as events:
+            event = events.from_dict({'name': 'click', 'count': '3'})
+            self.assertEqual(event.to_dict(), {'name': 'click', 'count': 3})
+            self.assertEqual(event.changed_fields(), set())
+
+    def test_instances_reused_after_scope(self):
+        with self.Event.pool() as events:
+            first = events.from_dict({'name': 'click', 'count': 3})
+            first.add_field('extra', 1, micromodels.IntegerField())
+        with self.Event.pool() as events:
+            second = events.from_dict({'name': 'view'})
+            self.assertIs(first, second)
+            self.assertEqual(second.to_dict(), {'name': 'view', 'count': 0})
+
+    def test_subclass_init_runs_for_new_instances(self):
+        class SeenEvent(self.Event):
+            def __init__(self, **values):
+                super(SeenEvent, self).__init__(**values)
+                self.seen = True
+
+        with SeenEvent.pool() as events:
+            event = events.from_dict({'name': 'click'})
+            self.assertTrue(event.seen)
+            self.assertEqual(event.name, 'click')
+
+    def test_size_limits_spares(self):
+        with self.Event.pool(size=1) as events:
+            for index in range(3):
+                events.from_dict({'count': index})
+        self.assertEqual(len(pool.spare_instances(self.Event)), 1)
+
+    def test_outside_scope(self):
+        events = self.Event.pool()
+        self.assertRaises(RuntimeError, events.from_dict, {})
+
+    def test_frozen_models_rejected(self):
+        class Point(micromodels.FrozenModel):
+            x = micromodels.IntegerField()
+
+        self.assertRaises(TypeError, Point.pool)
+
+
+class FrozenModelTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Country(micromodels.FrozenModel):
+            code = micromodels.CharField()
+
+        class City(micromodels.FrozenModel):
+            name = micromodels.CharField()
+            population = micromodels.IntegerField(default=0)
+            country = micromodels.ModelField(Country)
+
+        self.City = City
+        self.Country = Country
+        self.city = City.from_dict({'name': 'Paris',
+                                    'country': {'code': 'FR'}})
+
+    def test_fields_converted_up_front(self):
+        self.assertEqual(self.city.__dict__['population'], 0)
+        self.assertEqual(self.City().__dict__['name'], None)
+
+    def test_assignment_rejected(self):
+        self.assertRaises(micromodels.FrozenInstanceError, setattr,
+                          self.city, 'name', 'Lyon')
+        self.assertRaises(AttributeError, setattr, self.city, 'other', 1)
+        self.assertRaises(AttributeError, delattr, self.city, 'name')
+        self.assertRaises(AttributeError, self.city.add_field, 'x', 1,
+                          micromodels.IntegerField())
+        self.assertNotIn('x', self.city.to_dict())
+        other = self.City.from_dict({'name': 'Paris',
+                                     'country': {'code': 'FR'}})
+        self.assertEqual(self.city, other)
+        self.assertRaises(AttributeError, setattr, self.city.country,
+                          'code', 'DE')
+
+    def test_hashable(self):
+        other = self.City.from_dict({'name': 'Paris',
+                                     'country': {'code': 'FR'}})
+        self.assertEqual(hash(self.city), hash(other))
+        self.assertEqual(len(set([self.city, other])), 1)
+
+    def test_replace(self):
+        lyon = self.city.replace(name='Lyon', population='500000')
+        self.assertEqual(lyon.name, 'Lyon')
+        self.assertEqual(lyon.population, 500000)
+        self.assertIs(lyon.country, self.city.country)
+        self.assertEqual(self.city.name, 'Paris')
+        self.assertNotEqual(hash(lyon), hash(self.city))
+        self.assertRaises(AttributeError, setattr, lyon, 'name', 'Nice')
+        self.assertRaises(TypeError, self.city.replace, unknown=1)
+
+    def test_replace_mutable(self):
+        class Person(micromodels.Model):
+            name = micromodels.CharField()
+            age = micromodels.IntegerField(required=True)
+
+        person = Person.from_kwargs(name='Eric', age=1)
+        other = person.replace(name='John')
+        other.age = None
+        self.assertEqual(person.age, 1)
+        self.assertIsNone(person.validate())
+        self.assertEqual(other.name, 'John')
+        self.assertEqual(person.name, 'Eric')
+        self.assertEqual(other.changed_fields(), set(['age']))
+
+    def test_meta_option(self):
+        class Point(micromodels.Model):
+            x = micromodels.IntegerField()
+
+            class Meta:
+                frozen = True
+
+        point = Point.from_kwargs(x=1)
+        self.assertEqual(hash(point), hash(Point(x=1)))
+        self.assertRaises(AttributeError, setattr, point, 'x', 2)
+
+    def test_related_name_rejected(self):
+        self.assertRaises(TypeError, micromodels.ModelField, self.Country,
+                          related_name='city')
+
+    def test_decode_cache_shares_instances(self):
+        class Tag(micromodels.FrozenModel):
+            name = micromodels.CharField()
+
+            class Meta:
+                decode_cache = 10
+
+        self.assertIs(Tag.from_dict({'name': 'a'}),
+                      Tag.from_dict({'name': 'a'}))
+
+
+class FromJSONSchemaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'title': 'order',
+            'type': 'object',
+            'properties': {
+                'id': {'type': 'string', 'format': 'uuid'},
+                'placed': {'type': 'string', 'format': 'date-time'},
+                'count': {'type': ['integer', 'null'], 'default': 1},
+                'status': {'enum': ['open', 'closed']},
+                'customer': {'$ref': '#/definitions/customer'},
+                'lines': {'type': 'array', 'items': {
+                    'type': 'object',
+                    'properties': {'sku': {'type': 'string'},
+                                   'price': {'type': 'number'}},
+                }},
+                'tags': {'type': 'array', 'items': {'type': 'string'}},
+                'first-name': {'type': 'string'},
+                'last.name': {'type': 'string'},
+            },
+            'required': ['id'],
+            'definitions': {
+                'customer': {'type': 'object', 'properties': {
+                    'name': {'type': 'string'}}},
+            },
+        }
+
+    def test_generated_fields(self):
+        Order = schema.from_json_schema(self.schema)
+        self.assertEqual(Order.__name__, 'Order')
+        fields = Order._clsfields
+        self.assertTrue(isinstance(fields['id'], micromodels.UUIDField))
+        self.assertTrue(fields['id'].required)
+        self.assertFalse(fields['count'].required)
+        self.assertTrue(isinstance(fields['placed'],
+                                   micromodels.DateTimeField))
+        self.assertTrue(isinstance(fields['status'], micromodels.ChoiceField))
+        self.assertTrue(isinstance(fields['customer'],
+                                   micromodels.ModelField))
+        self.assertTrue(isinstance(fields['lines'],
+                                   micromodels.ModelCollectionField))
+        self.assertTrue(isinstance(fields['tags'],
+                                   micromodels.FieldCollectionField))
+        self.assertEqual(fields['first_name'].source, 'first-name')
+        self.assertEqual(fields['last_name'].source, ('last.name',))
+        self.assertIn('_plan', Order.__dict__)
+
+    def test_decoding(self):
+        Order = schema.from_json_schema(self.schema)
+        order = Order.from_dict({
+            'id': '101469a9-4adb-492a-9d7f-88c9c039ceb4',
+            'placed': '2010-07-13T14:01:00Z',
+            'status': 'open',
+            'customer': {'name': 'Eric'},
+            'lines': [{'sku': 'a', 'price': '1.5'}],
+            'first-name': 'Eric',
+        })
+        self.assertTrue(isinstance(order.id, uuid.UUID))
+        self.assertEqual(order.count, 1)
+        self.assertEqual(order.customer.name, 'Eric')
+        self.assertEqual(order.lines[0].price, 1.5)
+        self.assertEqual(order.first_name, 'Eric')
+        self.assertEqual(type(order.customer).__name__, 'Customer')
+
+    def test_cached_by_content(self):
+        first = schema.from_json_schema(self.schema)
+        copy = json.loads(json.dumps(self.schema))
+        self.assertIs(schema.from_json_schema(copy), first)
+        copy['properties']['extra'] = {'type': 'boolean'}
+        self.assertIsNot(schema.from_json_schema(copy), first)
+
+    def test_recursive_reference(self):
+        tree = {'$ref': '#/definitions/node', 'definitions': {'node': {
+            'type': 'object',
+            'properties': {'child': {'$ref': '#/definitions/node'}}}}}
+        self.assertRaises(ValueError, schema.from_json_schema, tree)
+
+
+class ToJSONSchemaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Line(micromodels.Model):
+            sku = micromodels.CharField(help_text='Stock keeping unit')
+            price = micromodels.DecimalField(required=False)
+
+        class Order(micromodels.Model):
+            id = micromodels.UUIDField()
+            placed = micromodels.DateTimeField()
+            due = micromodels.DateField(format='%d/%m/%Y', required=False)
+            count = micromodels.IntegerField(default=1)
+            status = micromodels.ChoiceField(['open', 'closed'])
+            lines = micromodels.ModelCollectionField(Line)
+            best = micromodels.ModelField(Line)
+            tags = micromodels.FieldCollectionField(micromodels.CharField(),
+                                                    source='labels')
+
+        self.Order = Order
+
+    def test_schema(self):
+        schema = self.Order.json_schema()
+        self.assertEqual(schema['title'], 'Order')
+        self.assertEqual(schema['type'], 'object')
+        self.assertEqual(schema['required'],
+                         ['id', 'placed', 'status'])
+        properties = schema['properties']
+        self.assertEqual(properties['id'],
+                         {'type': 'string', 'format': 'uuid'})
+        self.assertEqual(properties['placed'],
+                         {'type': 'string', 'format': 'date-time'})
+        self.assertEqual(properties['due'], {'type': ['string', 'null']})
+        self.assertEqual(properties['count'],
+                         {'type': ['integer', 'null'], 'default': 1})
+        self.assertEqual(properties['status'], {'enum': ['open', 'closed']})
+        self.assertEqual(properties['labels']['items'], {'type': 'string'})
+        self.assertEqual(properties['lines']['items'],
+                         {'$ref': '#/definitions/Line'})
+        line = schema['definitions']['Line']
+        self.assertEqual(line['required'], ['sku'])
+        self.assertEqual(line['properties']['sku']['description'],
+                         'Stock keeping unit')
+        self.assertEqual(list(schema['definitions']), ['Line'])
+
+    def test_schema_cached(self):
+        self.assertIs(self.Order.json_schema(), self.Order.json_schema())
+
+        class Child(self.Order):
+            extra = micromodels.CharField()
+
+        self.assertIn('extra', Child.json_schema()['properties'])
+        self.assertNotIn('extra', self.Order.json_schema()['properties'])
+
+    def test_boolean_fields_accept_missing_values(self):
+        class Toggle(micromodels.Model):
+            flag = micromodels.BooleanField()
+
+        schema = Toggle.json_schema()
+        self.assertNotIn('required', schema)
+        self.assertEqual(schema['properties']['flag'],
+                         {'type': ['boolean', 'null']})
+        self.assertEqual(Toggle.validate_many([{}, {'flag': None}]), [])
+
+    def test_source_data_defaults(self):
+        class Job(micromodels.Model):
+            start = micromodels.DateTimeField(default='2020-01-01T00:00:00')
+            retries = micromodels.IntegerField(default='3')
+
+        properties = Job.json_schema()['properties']
+        self.assertEqual(properties['start']['default'],
+                         '2020-01-01T00:00:00')
+        self.assertEqual(properties['retries']['default'], 3)
+
+    def test_round_trip(self):
+        Generated = schema.from_json_schema(self.Order.json_schema())
+        self.assertEqual(list(Generated._clsfields),
+                         ['id', 'placed', 'due', 'count', 'status', 'lines',
+                          'best', 'labels'])
+        self.assertTrue(isinstance(Generated._clsfields['id'],
+                                   micromodels.UUIDField))
+        self.assertTrue(isinstance(Generated._clsfields['best'],
+                                   micromodels.ModelField))
+
 
 class ModelValidationTestCase(unittest.TestCase):
     def setUp(self):
@@ -631,5 +1890,268 @@ class ModelValidationTestCase(unittest.TestCase):
         )
 
 
+class ValidateManyTestCase(unittest.TestCase):
+    def setUp(self):
+
+        class LineModel(micromodels.Model):
+            sku = micromodels.CharField(source='sku/id')
+            quantity = micromodels.IntegerField()
+
+            def validate_quantity(self):
+                if self.quantity < 1:
+                    raise micromodels.ValidationError('Must be positive.')
+
+        class OrderModel(micromodels.Model):
+            customer = micromodels.CharField()
+            lines = micromodels.ModelCollectionField(LineModel)
+
+        self.model = OrderModel
+
+    def test_valid_records(self):
+        records = [{'customer': 'a',
+                    'lines': [{'sku/id': 'x', 'quantity': 1}]}]
+        self.assertEqual(self.model.validate_many(records), [])
+
+    def test_error_paths(self):
+        records = [
+            {'customer': 'a', 'lines': [{'sku/id': 'x', 'quantity': 1}]},
+            {'lines': [{'sku/id': 'y', 'quantity': 'many'},
+                       {'quantity': 0}]},
+            'not a record',
+        ]
+        errors = self.model.validate_many(records)
+        self.assertEqual([error.path for error in errors], [
+            '/1/lines/0/quantity',
+            '/1/lines/1/sku~1id',
+            '/1/lines/1/quantity',
+            '/1/customer',
+            '/2',
+        ])
+        self.assertEqual(errors[2],
+                         micromodels.FieldError('/1/lines/1/quantity',
+                                                'Must be positive.'))
+
+    def test_instances(self):
+        instance = self.model.from_dict(
+            {'customer': 'a', 'lines': [{'sku/id': 'x', 'quantity': 0}]})
+        errors = self.model.validate_many([instance])
+        self.assertEqual(errors, [('/0/lines/0/quantity', 'Must be positive.')])
+
+    def test_max_errors(self):
+        errors = self.model.validate_many([{}] * 10, max_errors=3)
+        self.assertEqual([error.path for error in errors],
+                         ['/0/customer', '/1/customer', '/2/customer'])
+
+
+class RecordLayoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Reading(micromodels.Model):
+            sensor = micromodels.IntegerField()
+            value = micromodels.FloatField()
+            ok = micromodels.BooleanField()
+
+            class Meta:
+                struct_formats = {'sensor': 'H'}
+
+        self.model = Reading
+        self.layout = records.layout_for(Reading)
+        self.readings = [
+            Reading.from_kwargs(sensor=i, value=i / 2.0, ok=i % 2 == 0)
+            for i in range(5)
+        ]
+
+    def test_layout_compiled_once(self):
+        self.assertIs(records.layout_for(self.model), self.layout)
+        self.assertEqual(self.layout.struct.format, '<Hd?')
+        self.assertEqual(self.layout.size, 11)
+
+    def test_pack_unpack(self):
+        data = self.layout.pack(self.readings[3])
+        self.assertEqual(len(data), self.layout.size)
+        reading = self.layout.unpack(data)
+        self.assertTrue(isinstance(reading, self.model))
+        self.assertEqual(reading.to_dict(), self.readings[3].to_dict())
+        self.assertIsNone(reading.validate())
+
+    def test_pack_many_unpack_many(self):
+        buffer = self.layout.pack_many(self.readings)
+        self.assertEqual(len(buffer), self.layout.size * len(self.readings))
+        self.assertEqual([r.to_dict() for r in self.layout.unpack_many(buffer)],
+                         [r.to_dict() for r in self.readings])
+
+    def test_read_records(self):
+        stream = io.BytesIO(bytes(self.layout.pack_many(self.readings)))
+        result = list(self.layout.read_records(stream, chunk_records=2))
+        self.assertEqual([r.to_dict() for r in result],
+                         [r.to_dict() for r in self.readings])
+
+    def test_truncated_file(self):
+        stream = io.BytesIO(self.layout.pack(self.readings[0])[:-1])
+        self.assertRaises(ValueError, list, self.layout.read_records(stream))
+
+    def test_missing_value(self):
+        self.assertRaises(ValueError, self.layout.pack, self.model())
+
+    def test_non_numeric_model(self):
+        class Person(micromodels.Model):
+            name = micromodels.CharField()
+
+        self.assertRaises(TypeError, records.layout_for, Person)
+
+
+class BinaryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class Line(micromodels.Model):
+            sku = micromodels.UUIDField()
+            price = micromodels.DecimalField()
+
+        class Order(micromodels.Model):
+            id = micromodels.IntegerField()
+            note = micromodels.CharField()
+            placed = micromodels.DateTimeField()
+            ship_on = micromodels.DateField()
+            cutoff = micromodels.TimeField()
+            extra = micromodels.JSONField()
+            lines = micromodels.ModelCollectionField(Line)
+            tags = micromodels.FieldCollectionField(micromodels.CharField())
+
+        self.model = Order
+        self.data = {
+            'id': 7,
+            'note': u'caf\xe9',
+            'placed': '2010-07-13T14:02:00-05:00',
+            'ship_on': '2010-07-15',
+            'cutoff': '09:33:30',
+            'extra': '{"gift": true}',
+            'lines': [{'sku': '101469a9-4adb-492a-9d7f-88c9c039ceb4',
+                       'price': '9.99'}],
+            'tags': ['a', 'b'],
+        }
+
+    def test_model_round_trip(self):
+        order = self.model.from_dict(self.data)
+        decoded = self.model.from_msgpack(order.to_msgpack())
+        self.assertEqual(decoded.to_dict(serial=True),
+                         order.to_dict(serial=True))
+        self.assertEqual(decoded.placed, order.placed)
+        self.assertEqual(decoded.lines[0].price, decimal.Decimal('9.99'))
+
+    def test_native_values_preserved(self):
+        order = self.model.from_dict(self.data)
+        native = binary.loads(order.to_msgpack())
+        self.assertEqual(native['placed'], order.placed)
+        self.assertEqual(native['cutoff'], datetime.time(9, 33, 30))
+        self.assertEqual(native['lines'][0]['sku'], order.lines[0].sku)
+        self.assertEqual(native['extra'], {'gift': True})
+
+    def test_pure_encoding(self):
+        values = [None, True, False, 0, 127, 128, -1, -33, 2 ** 40, -2 ** 40,
+                  1.5, u'x' * 40, b'\x00\x01', list(range(20)),
+                  dict((str(i), i) for i in range(20)),
+                  decimal.Decimal('-1.10'), datetime.date(2011, 1, 30),
+                  datetime.datetime(2011, 1, 30, 1, 2, 3, 4)]
+        for value in values:
+            encoded = binary._pure_dumps(value)
+            self.assertEqual(binary._pure_loads(encoded), value)
+            if binary.msgpack is not None:
+                self.assertEqual(binary._msgpack_dumps(value), encoded)
+
+    def test_unsupported_value(self):
+        self.assertRaises(TypeError, binary.dumps, object())
+
+
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class AsyncJSONLinesTestCase(unittest.TestCase):
+
+    class Writer(object):
+
+        def __init__(self):
+            self.data = b''
+            self.drains = 0
+
+        def write(self, data):
+            self.data += data
+
+        def drain(self):
+            self.drains += 1
+            return asyncio.sleep(0)
+
+    def setUp(self):
+        class Person(micromodels.Model):
+            name = micromodels.CharField()
+            age = micromodels.IntegerField()
+
+        self.model = Person
+        self.people = [Person.from_kwargs(name='P%d' % i, age=i)
+                       for i in range(25)]
+
+    def run_until_complete(self, coroutine):
+        return asyncio.new_event_loop().run_until_complete(coroutine)
+
+    def collect(self, loop, iterator):
+        result = []
+        while True:
+            try:
+                result.append(loop.run_until_complete(iterator.__anext__()))
+            except StopAsyncIteration:
+                return result
+
+    def reader_for(self, data):
+        loop = asyncio.new_event_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        reader.feed_data(data)
+        reader.feed_eof()
+        return loop, reader
+
+    def test_write_then_read(self):
+        writer = self.Writer()
+        self.run_until_complete(
+            self.model.awrite_jsonl(writer, self.people, yield_every=10))
+        self.assertEqual(writer.drains, 3)
+        self.assertEqual(writer.data.count(b'\n'), 25)
+
+        loop, reader = self.reader_for(writer.data + b'\n')
+        people = self.collect(
+            loop, self.model.aiter_jsonl(reader, yield_every=10))
+        self.assertEqual([p.to_dict() for p in people],
+                         [p.to_dict() for p in self.people])
+
+    def test_read_yields_each_record_as_it_arrives(self):
+        loop = asyncio.new_event_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        iterator = self.model.aiter_jsonl(reader, yield_every=10)
+        reader.feed_data((self.people[0].to_json() + '\n').encode())
+        person = loop.run_until_complete(
+            asyncio.wait_for(iterator.__anext__(), 1))
+        self.assertEqual(person.name, 'P0')
+        reader.feed_eof()
+        self.assertEqual(self.collect(loop, iterator), [])
+
+    def test_read_with_executor_yields_partial_batches(self):
+        loop = asyncio.new_event_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        with ThreadPoolExecutor(1) as executor:
+            iterator = self.model.aiter_jsonl(reader, yield_every=10,
+                                              executor=executor)
+            reader.feed_data(b''.join(
+                (p.to_json() + '\n').encode() for p in self.people[:2]))
+            people = [loop.run_until_complete(
+                asyncio.wait_for(iterator.__anext__(), 1)) for _ in range(2)]
+            self.assertEqual([p.name for p in people], ['P0', 'P1'])
+            reader.feed_eof()
+            self.assertEqual(self.collect(loop, iterator), [])
+
+    def test_read_with_executor(self):
+        data = b''.join((p.to_json() + '\n').encode() for p in self.people)
+        loop, reader = self.reader_for(data)
+        with ThreadPoolExecutor(2) as executor:
+            people = self.collect(loop, self.model.aiter_jsonl(
+                reader, yield_every=7, executor=executor))
+        self.assertEqual(len(people), 25)
+        self.assertEqual(people[-1].age, 24)
+
+
 if __name__ == "__main__":
     unittest.main()